@@ -0,0 +1,365 @@
+import argparse
+import contextlib
+import http.client
+import inspect
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import signal
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from comp62521 import app, prefork
+from comp62521.database import database, synthetic
+
+# Times Database ingest, every public Database method and every Flask route on
+# synthetic datasets of increasing size, and writes a JSON report.
+#
+#     cd src
+#     python benchmark.py --sizes 10000,100000,1000000 --output report.json
+#
+# With --workers it also serves the app with the pre-fork server for each
+# worker count and measures requests per second and total memory (PSS).
+
+# methods that change or replace the data; ingest is timed separately
+MUTATING = {"read", "append", "add_publication", "remove_duplicate_publications",
+            "save_snapshot", "load_snapshot", "restore"}
+
+# size of the file appended by bench_append, relative to the dataset
+APPEND_FRACTION = 0.01
+
+STATUSES = {
+    "showPublicationSummary": ["publication_summary", "publication_year", "author_year"],
+    "showPublicationSummaryLink": ["publication_author", "author_apperance"],
+}
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def sample_authors(db):
+    # a prolific author, a typical one, and a pair far apart in the graph
+    degree = db.coauthor_graph.degree
+    busy = int(np.argmax(degree))
+    typical = int(np.argsort(degree)[len(degree) // 2])
+    far = int(np.argmin(np.where(degree > 0, degree, degree.max() + 1)))
+    return db.authors.name_list([busy, typical, far])
+
+
+def method_calls(db):
+    busy, typical, far = sample_authors(db)
+    surname = busy.split()[-1]
+    mid = (db.min_year + db.max_year) // 2
+    calls = {
+        "get_coauthor_data": [(None, None, 4), (mid - 2, mid + 2, 4), (mid - 2, mid + 2, 1)],
+        "get_coauthor_table": [(None, None, 4), (mid - 2, mid + 2, 4)],
+        "get_author_pub_by_year": [(surname,), (busy, mid - 5, mid + 5)],
+        "get_appearance_by_author_by_publications": [(), (surname,)],
+        "get_author_info_by_search": [(surname,), (surname[:2].lower(),)],
+        "get_single_author_info": [(busy,)],
+        "get_coauthor_details": [(busy,)],
+        "get_separation": [(busy, far)],
+        "get_separation_with_path": [(busy, far), (typical, far)],
+        "get_external_coauthor": [(busy,)],
+        "get_author_profiles": [(list(range(min(200, len(db.authors)))),)],
+        "get_table": [(name,) for name in database.PAGED_TABLES[:2]] + [("get_coauthor_data", None, None, 4)],
+        "search_author_names": [(surname,), (surname[:2].lower(),)],
+    }
+    for av in range(len(database.Stat.STR)):
+        for name in ("get_average_authors_per_publication", "get_average_publications_per_author",
+                     "get_average_publications_in_a_year", "get_average_authors_in_a_year",
+                     "get_publication_summary_average", "get_average_authors_per_publication_by_author",
+                     "get_average_authors_per_publication_by_year",
+                     "get_average_publications_per_author_by_year"):
+            calls.setdefault(name, []).append((av,))
+    return calls
+
+
+def bench_methods(db, size, repeat, report):
+    calls = method_calls(db)
+    for name, func in inspect.getmembers(database.Database, inspect.isfunction):
+        if name.startswith("_") or name in MUTATING:
+            continue
+        params = [p for p in list(inspect.signature(func).parameters.values())[1:]
+                  if p.default is inspect.Parameter.empty]
+        if name in calls:
+            arg_lists = calls[name]
+        elif not params:
+            arg_lists = [()]
+        else:
+            report.append({"size": size, "kind": "method", "name": name, "skipped": "no arguments known"})
+            continue
+        target = getattr(db, name)
+        for args in arg_lists:
+            times = []
+            error = None
+            for _ in range(repeat):
+                db.cache.clear()
+                try:
+                    seconds, _ = timed(target, *args)
+                except Exception as e:
+                    error = type(e).__name__
+                    break
+                times.append(seconds)
+            entry = {"size": size, "kind": "method", "name": name, "args": describe(args)}
+            if error:
+                entry["error"] = error
+            else:
+                entry.update(first=times[0], min=min(times), median=statistics.median(times))
+            report.append(entry)
+            print(f"  {name}({entry['args']}): {entry.get('median', entry.get('error'))}")
+
+
+def describe(args):
+    return ", ".join(f"<{len(a)} items>" if isinstance(a, list) else repr(a) for a in args)
+
+
+def route_urls(db):
+    busy, _, far = sample_authors(db)
+    surname = busy.split()[-1]
+    values = {"authorname": busy, "name": busy, "av": 0}
+    query = {
+        "showCoAuthors": [{}, {"start_year": db.max_year - 3, "end_year": db.max_year, "pub_type": 1, "sort": 0}],
+        "search_author_pub": [{"author_name": surname}],
+        "search_author": [{"author_name": surname}],
+        "showAuthorAppearance": [{}, {"author_name": surname}],
+        "get_separation_between_authors": [{"author1": busy, "author2": far}],
+        "api_coauthors": [{"start_year": db.max_year - 3, "end_year": db.max_year}],
+        "api_search_authors": [{"name": surname}],
+        "api_separation": [{"author1": busy, "author2": far}],
+    }
+    with app.test_request_context():
+        from flask import url_for
+        for rule in app.url_map.iter_rules():
+            if rule.endpoint == "static":
+                continue
+            for status in STATUSES.get(rule.endpoint, [None]):
+                args = {k: values[k] for k in rule.arguments if k in values}
+                if status is not None:
+                    args["status"] = status
+                for q in query.get(rule.endpoint, [{}]):
+                    yield rule.endpoint, url_for(rule.endpoint, **args, **q)
+
+
+def bench_routes(db, size, repeat, report):
+    app.config.update(DATASET=["synthetic"], DATABASE=db, TESTING=True)
+    client = app.test_client()
+    for endpoint, url in route_urls(db):
+        times = []
+        for _ in range(repeat):
+            db.cache.clear()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = client.get(url)
+                body = response.get_data()
+            times.append(time.perf_counter() - start)
+        report.append({"size": size, "kind": "route", "name": endpoint, "url": url,
+                       "status": response.status_code, "bytes": len(body),
+                       "first": times[0], "min": min(times), "median": statistics.median(times)})
+        print(f"  {url}: {response.status_code} {statistics.median(times):.4f}s")
+
+
+# routes requested in turn by the serving benchmark
+SERVING_MIX = ["showStatisticsMenu", "showAverages", "showCoAuthors", "search_author", "post_author",
+               "get_separation_between_authors", "api_summary", "api_coauthors"]
+
+
+def _client(args):
+    # request urls in turn for the given number of seconds; returns the
+    # number of responses and of errors
+    port, urls, seconds = args
+    done = errors = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        try:
+            conn.request("GET", urls[done % len(urls)])
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except OSError:
+            errors += 1
+        finally:
+            conn.close()
+        done += 1
+    return done, errors
+
+
+def _pss(pid):
+    # proportional set size of a process in bytes, 0 if unknown
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _children(pid):
+    found = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        found.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return found
+
+
+def _wait_until_serving(port, timeout=60):
+    end = time.perf_counter() + timeout
+    while time.perf_counter() < end:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.1)
+        finally:
+            conn.close()
+    return False
+
+
+def bench_serving(db, size, worker_counts, seconds, report):
+    app.config.update(DATASET=["synthetic"], DATABASE=db, TESTING=False)
+    urls = [url for endpoint, url in route_urls(db) if endpoint in SERVING_MIX]
+    clients = 2 * max(worker_counts)
+    db.finalize()
+    for workers in worker_counts:
+        sock = prefork.listen("127.0.0.1", 0)
+        port = sock.getsockname()[1]
+        pid = os.fork()
+        if pid == 0:
+            with contextlib.redirect_stderr(io.StringIO()), contextlib.redirect_stdout(io.StringIO()):
+                prefork.freeze(db)
+                prefork.serve(app, "127.0.0.1", port, workers, sock)
+            os._exit(0)
+        sock.close()
+        try:
+            if not _wait_until_serving(port):
+                report.append({"size": size, "kind": "serving", "workers": workers, "error": "server did not start"})
+                continue
+            with multiprocessing.get_context("fork").Pool(clients) as pool:
+                # the first pass fills each worker's query cache and is not counted
+                for duration in (seconds, seconds):
+                    results = pool.map(_client, [(port, urls[i:] + urls[:i], duration) for i in range(clients)])
+            done = sum(r[0] for r in results)
+            errors = sum(r[1] for r in results)
+            memory = sum(_pss(p) for p in [pid] + _children(pid))
+        finally:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+        report.append({"size": size, "kind": "serving", "workers": workers, "clients": clients,
+                       "seconds": seconds, "requests": done, "errors": errors,
+                       "requests_per_second": done / seconds, "pss_bytes": memory})
+        print(f"  {workers} workers: {done / seconds:.1f} req/s, {errors} errors, {memory / 2 ** 20:.0f} MiB PSS")
+
+
+def bench_ingest(filename, size, workdir, report):
+    results = {}
+    for label, kwargs in (("read", {}), ("read_streaming", {"streaming": True})):
+        db = database.Database()
+        seconds, ok = timed(lambda: db.read([filename], **kwargs))
+        results[label] = db
+        report.append({"size": size, "kind": "ingest", "name": label, "seconds": seconds, "ok": ok,
+                       "publications": len(db.publications), "authors": len(db.authors),
+                       "publications_per_second": len(db.publications) / seconds})
+        print(f"  {label}: {seconds:.2f}s")
+
+    db = results["read_streaming"]
+    directory = os.path.join(workdir, f"snapshot-{size}")
+    seconds, _ = timed(db.save_snapshot, directory, [filename])
+    report.append({"size": size, "kind": "ingest", "name": "save_snapshot", "seconds": seconds})
+    loaded = database.Database()
+    seconds, ok = timed(loaded.load_snapshot, directory, [filename])
+    report.append({"size": size, "kind": "ingest", "name": "load_snapshot", "seconds": seconds, "ok": ok})
+    shutil.rmtree(directory, ignore_errors=True)
+    return db
+
+
+def bench_append(filename, extra, size, report):
+    # Database.append of a second file to a loaded dataset with all derived
+    # structures built, against reading both files and building them again
+    db = database.Database()
+    timed(db.read, [filename])
+    db.finalize()
+    seconds, result = timed(db.append, [extra])
+    report.append({"size": size, "kind": "ingest", "name": "append", "seconds": seconds, "ok": result.valid,
+                   "publications": result.publications, "new_authors": result.new_authors})
+
+    full = database.Database()
+    rebuild, _ = timed(lambda: (full.read([filename, extra]), full.finalize()))
+    report.append({"size": size, "kind": "ingest", "name": "read_all", "seconds": rebuild,
+                   "publications": len(full.publications)})
+    print(f"  append {result.publications} publications: {seconds:.2f}s, full read: {rebuild:.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Database and the Flask routes on synthetic DBLP data")
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="comma-separated numbers of publications (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed calls per method or route")
+    parser.add_argument("--data-dir", help="keep the generated XML files here and reuse them")
+    parser.add_argument("--output", default="benchmark-report.json")
+    parser.add_argument("--no-routes", action="store_true", help="skip the Flask routes")
+    parser.add_argument("--workers", help="comma-separated worker counts for the pre-fork serving benchmark")
+    parser.add_argument("--serve-seconds", type=float, default=10, help="load time per worker count")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="comp62521-bench-")
+    data_dir = args.data_dir or workdir
+    os.makedirs(data_dir, exist_ok=True)
+    report = []
+    try:
+        for size in [int(s) for s in args.sizes.split(",")]:
+            filename = os.path.join(data_dir, f"synthetic-{size}-{args.seed}.xml")
+            if not os.path.exists(filename):
+                print(f"Generating {filename}")
+                seconds, _ = timed(synthetic.generate, filename, size, args.seed)
+                report.append({"size": size, "kind": "generate", "name": "generate", "seconds": seconds,
+                               "bytes": os.path.getsize(filename)})
+            print(f"Ingest, {size} publications")
+            db = bench_ingest(filename, size, workdir, report)
+            extra = os.path.join(data_dir, f"synthetic-{size}-{args.seed}-append.xml")
+            if not os.path.exists(extra):
+                timed(synthetic.generate, extra, max(int(size * APPEND_FRACTION), 100), args.seed + 1)
+            bench_append(filename, extra, size, report)
+            print(f"Methods, {size} publications")
+            bench_methods(db, size, args.repeat, report)
+            if not args.no_routes:
+                print(f"Routes, {size} publications")
+                bench_routes(db, size, args.repeat, report)
+            if args.workers:
+                print(f"Serving, {size} publications")
+                bench_serving(db, size, [int(w) for w in args.workers.split(",")], args.serve_seconds, report)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    meta = {"seed": args.seed, "repeat": args.repeat, "python": platform.python_version(),
+            "numpy": np.__version__, "platform": platform.platform(), "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(args.output, "w") as f:
+        json.dump({"meta": meta, "results": report}, f, indent=1)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import functools
+import json
+
+import numpy as np
+from flask import request, Response
+
+from comp62521 import app
+from comp62521.database import database
+from comp62521.views import table_page
+
+
+def to_json(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def json_response(body, status=200):
+    return Response(json.dumps(body, default=to_json), status=status, mimetype="application/json")
+
+
+def api_route(rule, etag=None):
+    # JSON route whose ETag is the dataset version: a client that already has
+    # the current version gets 304 without the query being run. A database
+    # without versions (the mock) gets no ETag. etag(db), if given, returns
+    # the ETag of a route that depends on more than the dataset.
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            db = app.config['DATABASE']
+            tag = getattr(db, "etag", None)
+            if tag is not None and etag is not None:
+                tag = etag(db)
+            if tag is not None and request.if_none_match.contains(tag):
+                response = Response(status=304)
+            else:
+                try:
+                    response = json_response(view(db, *args, **kwargs))
+                except (KeyError, ValueError):
+                    return json_response({"error": "not found"}, 404)
+            if tag is not None:
+                response.set_etag(tag)
+            return response
+        return app.route(rule, endpoint="api_" + view.__name__)(wrapper)
+    return decorator
+
+
+def table(header, rows):
+    return {"header": list(header), "rows": rows}
+
+
+def year_range(db):
+    return (request.args.get("start_year", db.min_year, type=int),
+            request.args.get("end_year", db.max_year, type=int))
+
+
+@api_route("/api/summary")
+def summary(db):
+    return table(*db.get_publication_summary())
+
+
+@api_route("/api/summary/<int:av>")
+def summary_average(db, av):
+    if not 0 <= av < len(database.Stat.STR):
+        raise ValueError
+    return table(*db.get_publication_summary_average(av))
+
+
+@api_route("/api/years/publications")
+def publications_by_year(db):
+    return table(*db.get_publications_by_year())
+
+
+@api_route("/api/years/authors")
+def authors_by_year(db):
+    return table(*db.get_author_totals_by_year())
+
+
+@api_route("/api/averages")
+def averages(db):
+    header, tables = db.get_averages()
+    return {"header": list(header),
+            "tables": [{"title": database.AverageTable.STR[t],
+                        "rows": dict(zip(database.Stat.STR, tables[t]))}
+                       for t in range(len(tables))]}
+
+
+@api_route("/api/coauthors")
+def coauthors(db):
+    start_year, end_year = year_range(db)
+    pub_type = request.args.get("pub_type", 4, type=int)
+    paging = table_page(db.get_table("get_coauthor_data", start_year, end_year, pub_type))
+    body = table(("Author", "Co-Authors"), paging.pop("rows"))
+    body.update(paging)
+    return body
+
+
+@api_route("/api/authors")
+def search_authors(db):
+    return table(*db.get_author_info_by_search(request.args.get("name", "")))
+
+
+@api_route("/api/authors/<name>")
+def author(db, name):
+    profile = db.get_author_profiles([db.author_idx[name]])[0]
+    types = database.PublicationType + ["All"]
+    return {"name": profile.name,
+            "publications": dict(zip(types, profile.publications)),
+            "coauthors": profile.coauthors,
+            "first_author": dict(zip(types, [a[0] for a in profile.appearance])),
+            "last_author": dict(zip(types, [a[1] for a in profile.appearance])),
+            "sole_author": dict(zip(types, [a[2] for a in profile.appearance]))}
+
+
+def staff_etag(db):
+    # the co-author counts also depend on the staff roster, which is read
+    # again whenever its file changes
+    db.staff.refresh()
+    return f"{db.etag}-{db.staff.version}"
+
+
+@api_route("/api/collaboration", etag=staff_etag)
+def collaboration(db):
+    names = request.args.getlist("name")
+    if names:
+        return table(*db.get_external_collaboration(names))
+    return table(*db.get_staff_collaboration())
+
+
+@api_route("/api/separation")
+def separation(db):
+    header, data, path = db.get_separation_with_path(request.args.get("author1"), request.args.get("author2"))
+    body = dict(zip(["author1", "author2", "separation"], data))
+    if body["separation"] == 'X':
+        body["separation"] = None
+    body["path"] = path
+    return body
@@ -0,0 +1,190 @@
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+from comp62521.database.store import Column
+
+
+# An author as seen by callers: the table it lives in and its id. The name is
+# decoded from the table when asked for, so holding many of these is cheap.
+class Author:
+    __slots__ = ("table", "id")
+
+    def __init__(self, table, id):
+        self.table = table
+        self.id = id
+
+    @property
+    def name(self):
+        return self.table.name(self.id)
+
+    def __repr__(self):
+        return f"Author({self.id}, {self.name!r})"
+
+
+# Names of all authors, in id order, as a read-only sequence of strings
+class NameList(Sequence):
+    __slots__ = ("table",)
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.table.name(a) for a in range(*i.indices(len(self.table)))]
+        return self.table.name(self._check(i))
+
+    def __iter__(self):
+        return iter(self.table.name_list())
+
+    def _check(self, i):
+        n = len(self.table)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("author index out of range")
+        return i
+
+
+# Name -> author id, as a read-only mapping
+class AuthorIndex(Mapping):
+    __slots__ = ("table",)
+
+    def __init__(self, table):
+        self.table = table
+
+    def __getitem__(self, name):
+        a = self.table.find(name)
+        if a < 0:
+            raise KeyError(name)
+        return a
+
+    def __contains__(self, name):
+        return isinstance(name, str) and self.table.find(name) >= 0
+
+    def __len__(self):
+        return len(self.table)
+
+    def __iter__(self):
+        return iter(self.table.name_list())
+
+
+# Interned author names. Every name is stored once, UTF-8 encoded, in one
+# contiguous arena: the name of author a is arena[offsets[a]:offsets[a + 1]].
+# Ids are found through an open-addressing hash table held in a NumPy array:
+# slot hash(name) & mask, or the next free one after it, holds the id, and a
+# candidate is checked against the arena bytes. The table is kept at most half
+# full, which costs 8 to 16 bytes per author.
+class AuthorTable:
+    MIN_SLOTS = 1 << 10
+
+    def __init__(self):
+        self.arena = Column(np.uint8, capacity=1 << 16)
+        self.offsets = Column(np.int64, [0])
+        self._slots = np.full(self.MIN_SLOTS, -1, dtype=np.int32)
+        self._views = None
+        self.names = NameList(self)
+        self.ids = AuthorIndex(self)
+
+    @classmethod
+    def wrap(cls, arena, offsets):
+        # table over existing arrays, e.g. memory-mapped from a snapshot
+        table = cls()
+        table.arena = Column.wrap(arena)
+        table.offsets = Column.wrap(offsets)
+        table._rehash()
+        return table
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return Author(self, self.names._check(i))
+
+    def __iter__(self):
+        for a in range(len(self)):
+            yield Author(self, a)
+
+    def _memory(self):
+        # memoryviews of the arena, offsets and slots, whose items index as
+        # plain Python ints; renewed when a column has moved to a new buffer
+        views = self._views
+        if (views is None or views[3] is not self.arena._data or views[4] is not self.offsets._data
+                or views[5] is not self._slots):
+            arena, offsets, slots = self.arena._data, self.offsets._data, self._slots
+            views = self._views = (memoryview(arena), memoryview(offsets), memoryview(slots),
+                                   arena, offsets, slots)
+        return views
+
+    def name(self, a):
+        arena, offsets = self._memory()[:2]
+        return str(arena[offsets[a]:offsets[a + 1]], "utf-8")
+
+    def name_list(self, ids=None):
+        # decoded names of ids (all authors by default), without building an
+        # Author for each
+        if ids is None:
+            arena = self.arena.values.tobytes()
+            offsets = self.offsets.values.tolist()
+            return [arena[offsets[a]:offsets[a + 1]].decode("utf-8") for a in range(len(self))]
+        arena, offsets = self._memory()[:2]
+        return [str(arena[offsets[a]:offsets[a + 1]], "utf-8") for a in ids]
+
+    def find(self, name):
+        # id of name, or -1
+        return self._probe(name, name.encode("utf-8"))[0]
+
+    def _probe(self, name, data):
+        # (id, slot): the id of the name whose UTF-8 bytes are data, or -1
+        # and the free slot where it would go
+        arena, offsets, slots = self._memory()[:3]
+        mask = len(slots) - 1
+        i = hash(name) & mask
+        while True:
+            a = slots[i]
+            if a < 0 or arena[offsets[a]:offsets[a + 1]] == data:
+                return a, i
+            i = (i + 1) & mask
+
+    def add(self, name):
+        # id of name, appending it if it is new
+        data = name.encode("utf-8")
+        a, slot = self._probe(name, data)
+        if a < 0:
+            a = len(self)
+            self.arena.extend(np.frombuffer(data, dtype=np.uint8))
+            self.offsets.append(len(self.arena))
+            if 2 * (a + 1) > len(self._slots):
+                self._rehash()
+            else:
+                self._slots[slot] = a
+        return a
+
+    def _rehash(self):
+        # place every author in a table of at least twice as many slots, one
+        # probe step at a time for all authors still without a slot
+        n = len(self)
+        size = self.MIN_SLOTS
+        while size < 2 * n:
+            size *= 2
+        slots = np.full(size, -1, dtype=np.int32)
+        mask = size - 1
+        pending = np.arange(n, dtype=np.int32)
+        pos = np.array([hash(name) & mask for name in self.name_list()], dtype=np.int64)
+        while len(pending):
+            free = slots[pos] < 0
+            # of several authors probing the same free slot, the first wins
+            _, first = np.unique(pos[free], return_index=True)
+            won = np.flatnonzero(free)[first]
+            slots[pos[won]] = pending[won]
+            lost = np.ones(len(pending), dtype=bool)
+            lost[won] = False
+            pending, pos = pending[lost], (pos[lost] + 1) & mask
+        self._slots = slots
+
+    @property
+    def nbytes(self):
+        return self.arena.values.nbytes + self.offsets.values.nbytes + self._slots.nbytes
@@ -0,0 +1,129 @@
+import functools
+import itertools
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_BYTES = 256 * 1024 * 1024
+# items of a long sequence looked at when estimating its size
+SAMPLE = 32
+
+
+def result_size(value):
+    # approximate bytes held by a query result; long sequences are estimated
+    # from their first SAMPLE items
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) + (value.nbytes if value.base is not None else 0)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        items = (k for item in value.items() for k in item)
+        n = 2 * len(value)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = value
+        n = len(value)
+    elif hasattr(value, "__dict__"):
+        return size + result_size(vars(value))
+    else:
+        return size
+    sample = [result_size(item) for item in itertools.islice(items, SAMPLE)]
+    return size + (sum(sample) * n // len(sample) if sample else 0)
+
+
+# LRU map from (method name, arguments) to a query result, bounded by both
+# the number of entries and their approximate size in bytes. A result larger
+# than the whole budget is not cached and counts as rejected. Every entry belongs to one dataset
+# version; the first lookup made under a newer version drops everything
+# cached for the old one, while lookups under an older version just miss.
+class QueryCache:
+    def __init__(self, maxsize=256, max_bytes=MAX_BYTES):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, version, key):
+        # Returns (found, result)
+        with self._lock:
+            if self.version is None or version > self.version:
+                self._entries.clear()
+                self.bytes = 0
+                self.version = version
+            entry = self._entries.get(key) if version == self.version else None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, version, key, result):
+        if version != self.version or self.maxsize <= 0:
+            return
+        size = result_size(result)
+        with self._lock:
+            if version != self.version:
+                return
+            if size > self.max_bytes:
+                self.rejected += 1
+                return
+            if key in self._entries:
+                self.bytes -= self._entries[key][1]
+            self._entries[key] = (result, size)
+            self._entries.move_to_end(key)
+            self.bytes += size
+            while len(self._entries) > self.maxsize or self.bytes > self.max_bytes:
+                _, (_, size) = self._entries.popitem(last=False)
+                self.bytes -= size
+                self.evictions += 1
+
+    def carry(self, old, new, keep):
+        # move the results cached under version old whose key passes keep()
+        # to version new and drop the rest
+        with self._lock:
+            if self.version != old:
+                self._entries.clear()
+                self.bytes = 0
+            else:
+                for key in [k for k in self._entries if not keep(k)]:
+                    self.bytes -= self._entries.pop(key)[1]
+            self.version = new
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "rejected": self.rejected, "size": len(self._entries), "maxsize": self.maxsize,
+                "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+
+def cached(method):
+    # Memoize a Database query method in db.cache under db.version. Results are
+    # shared between callers and must not be modified.
+    @functools.wraps(method)
+    def wrapper(db, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        version = db.version
+        try:
+            found, result = db.cache.get(version, key)
+        except TypeError:
+            # unhashable arguments are never cached
+            return method(db, *args, **kwargs)
+        if not found:
+            result = method(db, *args, **kwargs)
+            db.cache.put(version, key, result)
+        return result
+    return wrapper
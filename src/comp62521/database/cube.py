@@ -0,0 +1,81 @@
+import numpy as np
+
+from comp62521.database.graph import locate
+
+
+# Sparse author x year x publication type count cube. Only the non-empty
+# (author, year) cells are stored, sorted by author and then year, so the cells
+# of author a are offsets[a]:offsets[a + 1]. counts[c, t] is the number of
+# authorships of type t in cell c, and first[c] is the position of the first
+# authorship entry that fell into cell c, which recovers reading order.
+class CountCube:
+    def __init__(self, offsets, authors, years, counts, first):
+        self.offsets = offsets
+        self.authors = authors
+        self.years = years
+        self.counts = counts
+        self.first = first
+
+    @classmethod
+    def from_publications(cls, store, num_authors):
+        per_pub = store.author_counts()
+        years = np.repeat(store.year.values, per_pub).astype(np.int64)
+        types = np.repeat(store.pub_type.values.astype(np.int64), per_pub)
+        authors = store.author_ids.values.astype(np.int64)
+        if len(authors) == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(np.zeros(num_authors + 1, dtype=np.int64), empty, empty,
+                       np.zeros((0, 4), dtype=np.int64), empty)
+
+        min_year = years.min()
+        ny = int(years.max() - min_year) + 1
+        keys, first, inverse = np.unique(authors * ny + (years - min_year),
+                                         return_index=True, return_inverse=True)
+        counts = np.bincount(inverse * 4 + types, minlength=len(keys) * 4).reshape(-1, 4)
+        cell_authors = keys // ny
+        return cls(np.searchsorted(cell_authors, np.arange(num_authors + 1)),
+                   cell_authors, keys % ny + min_year, counts, first)
+
+    def merge(self, delta, base, num_authors):
+        # cube of this cube's entries plus those of delta, a cube built from
+        # publications appended since; base is the number of authorship
+        # entries before them and num_authors the new number of authors
+        years = np.concatenate((self.years, delta.years))
+        if len(years) == 0:
+            return delta
+        min_year = years.min()
+        ny = int(years.max() - min_year) + 1
+        keys = self.authors * ny + (self.years - min_year)
+        new = delta.authors * ny + (delta.years - min_year)
+        # a cell already present keeps its earlier first entry
+        pos, found = locate(keys, new)
+        counts = self.counts.copy()
+        counts[pos[found]] += delta.counts[found]
+        at = pos[~found]
+        authors = np.insert(self.authors, at, delta.authors[~found])
+        return CountCube(np.searchsorted(authors, np.arange(num_authors + 1)), authors,
+                         np.insert(self.years, at, delta.years[~found]),
+                         np.insert(counts, at, delta.counts[~found], axis=0),
+                         np.insert(self.first, at, delta.first[~found] + base))
+
+    def __len__(self):
+        return len(self.years)
+
+    def cells_of(self, author_id, start_year=None, end_year=None):
+        # range of the cells of one author, optionally limited to the years
+        # start_year..end_year inclusive
+        lo, hi = int(self.offsets[author_id]), int(self.offsets[author_id + 1])
+        if start_year is not None:
+            lo += int(np.searchsorted(self.years[lo:hi], start_year))
+        if end_year is not None:
+            hi = lo + int(np.searchsorted(self.years[lo:hi], end_year, side="right"))
+        return lo, hi
+
+    def authors_per_year(self, years, ny):
+        # number of distinct authors per year for each type and over all
+        # types; years maps every cell to its year index in 0..ny - 1
+        result = np.zeros((ny, 5), dtype=np.int64)
+        for t in range(4):
+            result[:, t] = np.bincount(years[self.counts[:, t] > 0], minlength=ny)
+        result[:, 4] = np.bincount(years, minlength=ny)
+        return result
@@ -1,33 +1,33 @@
 
 from werkzeug.exceptions import NotFound
 from comp62521.statistics import average
-import itertools
+from comp62521.database.authors import AuthorTable
+from comp62521.database.cache import MAX_BYTES, QueryCache, cached
+from comp62521.database.cube import CountCube
+from comp62521.database.graph import CoauthorGraph, TemporalCoauthorIndex
+from comp62521.database.search import NameIndex
+from comp62521.database.staff import STAFF_FILE, StaffRoster
+from comp62521.database import ingest, snapshot
+from comp62521.database.store import Publication, PublicationStore
+from comp62521.database.table import CoauthorTable, SortedTable
 import numpy as np
+import uuid
 import xml.sax
 
 PublicationType = ["Conference Paper", "Journal", "Book", "Book Chapter"]
 
 
-class Publication:
-    CONFERENCE_PAPER = 0
-    JOURNAL = 1
-    BOOK = 2
-    BOOK_CHAPTER = 3
+# Profile of one author as shown by /searchauthor and /authorinfo.
+# publications and each appearance row are indexed by publication type,
+# with ALL_TYPES for the total; appearance rows are [first, last, sole].
+class AuthorProfile:
+    __slots__ = ("name", "publications", "coauthors", "appearance")
 
-    def __init__(self, pub_type, title, year, authors, key):
-        self.pub_type = pub_type
-        self.title = title
-        if year:
-            self.year = int(year)
-        else:
-            self.year = -1
-        self.authors = authors
-        self.key = key
-
-
-class Author:
-    def __init__(self, name):
+    def __init__(self, name, publications, coauthors, appearance):
         self.name = name
+        self.publications = publications
+        self.coauthors = coauthors
+        self.appearance = appearance
 
 
 class Stat:
@@ -38,53 +38,120 @@ class Stat:
     MODE = 2
 
 
+class AverageTable:
+    STR = ["Average Authors per Publication", "Average Publications per Author",
+           "Average Publications in a Year", "Average Authors in a Year"]
+    AUTHORS_PER_PUBLICATION = 0
+    PUBLICATIONS_PER_AUTHOR = 1
+    PUBLICATIONS_IN_A_YEAR = 2
+    AUTHORS_IN_A_YEAR = 3
+
+
+# index of the all-types total in Database.appearance
+ALL_TYPES = len(PublicationType)
+
+
+# query methods whose results can be served page by page through get_table
+PAGED_TABLES = ("get_publications_by_author", "get_appearance_by_author", "get_coauthor_data")
+
+
+# What Database.append changed. aggregates names the derived data that was
+# updated; affects(key) tells whether a query result cached under key (as
+# made by @cached) may differ now. rebuilt is set when the derived data had
+# to be rebuilt from scratch.
+class AppendReport:
+    def __init__(self, valid):
+        self.valid = valid
+        self.publications = 0
+        self.new_authors = 0
+        self.rebuilt = False
+        self.aggregates = set()
+        # names of the authors of the new publications
+        self.authors = frozenset()
+        # (year, type) of every new publication with co-authors
+        self.pair_cells = set()
+        self.new_edges = False
+
+    def affects(self, key):
+        name, args, _ = key
+        if self.rebuilt:
+            return True
+        if self.publications == 0:
+            return False
+        if name in ("get_single_author_info", "get_coauthor_details"):
+            return args[0] in self.authors
+        if name == "get_separation_with_path":
+            return self.new_edges
+        if name in ("get_coauthor_data", "_coauthor_table"):
+            start_year, end_year, pub_type = args
+            return any((start_year is None or start_year <= year) and (end_year is None or year <= end_year)
+                       and pub_type in (4, t) for year, t in self.pair_cells)
+        return True
+
+    def __str__(self):
+        changed = ", ".join(sorted(self.aggregates)) or "nothing"
+        return (f"Appended {self.publications} publications and {self.new_authors} new authors"
+                f"{' (rebuilt)' if self.rebuilt else ''}; changed: {changed}")
+
+
+# derived structures that Database.append extends in place of a rebuild
+INCREMENTAL = ("coauthor_graph", "coauthor_index", "count_cube", "publication_counts",
+               "appearance", "name_index")
+
+
+class Duplicates:
+    KEEP_ALL = 0
+    KEEP_FIRST = 1
+    KEEP_LAST = 2
+
+
 class Database:
-    def __init__(self):
-        self.publications = []
-        self.authors = []
-        self.author_idx = {}
+    def __init__(self, duplicates=Duplicates.KEEP_ALL, cache_size=256, staff_file=STAFF_FILE,
+                 cache_bytes=MAX_BYTES):
+        self.duplicates = duplicates
+        self.staff = StaffRoster(staff_file)
+        self._staff_mask = None
+        self._staff_version = None
+        # bumped on every change to the data; cached query results are only
+        # reused under the version they were computed for
+        self.version = 0
+        self._instance = uuid.uuid4().hex[:16]
+        self.cache = QueryCache(cache_size, cache_bytes)
+        self.publications = PublicationStore()
+        self.authors = AuthorTable()
+        self.author_idx = self.authors.ids
         self.min_year = None
         self.max_year = None
-
-    def read(self, filenames):
-        self.publications = []
-        self.authors = []
-        self.author_idx = {}
+        self._coauthor_graph = None
+        self._coauthor_index = None
+        self._appearance = None
+        self._publication_counts = None
+        self._count_cube = None
+        self._whole_coauthor_table = None
+        self._name_index = None
+        self._key_index = None
+        self._superseded = []
+        self.duplicates_removed = 0
+        self.ingest_stats = []
+
+    def read(self, filenames, streaming=False, processes=1):
+        self.publications = PublicationStore()
+        self.authors = AuthorTable()
+        self.author_idx = self.authors.ids
         self.min_year = None
         self.max_year = None
+        self._invalidate(authors=True)
+        self._key_index = None
+        self._superseded = []
+        self.duplicates_removed = 0
+        self.ingest_stats = []
 
-        handler = DocumentHandler(self)
-        parser = xml.sax.make_parser()
-        parser.setContentHandler(handler)
-        valid = True
-        if isinstance(filenames, str):
-            infile = open(filenames, "r")
-            try:
-                parser.parse(infile)
-            except xml.sax.SAXException as e:
-                valid = False
-                print("Error reading file (" + e.getMessage() + ")")
-            infile.close()
-        else:
-            if len(filenames) == 1:
-                infile = open(filenames[0], "r")
-                try:
-                    parser.parse(infile)
-                except xml.sax.SAXException as e:
-                    valid = False
-                    print("Error reading file (" + e.getMessage() + ")")
-                infile.close()
-            else:
-                for file in filenames:
-                    infile = open(file, "r")
-                    try:
-                        parser.parse(infile)
-                    except xml.sax.SAXException as e:
-                        valid = False
-                        print("Error reading file (" + e.getMessage() + ")")
-                    infile.close()
+        valid = self._ingest(filenames, streaming, processes)
 
+        self._drop_superseded()
 
+        self._coauthor_graph = CoauthorGraph.from_publications(self.publications, len(self.authors))
+        self._name_index = NameIndex(self.authors.names, self.author_idx)
 
         # ** repeat check, delete for line coverage **
         # for p in self.publications:
@@ -95,355 +162,403 @@ class Database:
 
         return valid
 
-    def get_all_authors(self):
-        return self.author_idx.keys()
+    def append(self, filenames, streaming=False, processes=1):
+        # Add the publications of filenames to the data already loaded without
+        # reading the rest again. Derived structures that have been built are
+        # extended from the new publications alone, and cached query results
+        # that they cannot have changed are kept. Returns an AppendReport.
+        version = self.version
+        start = len(self.publications)
+        base = len(self.publications.author_ids)
+        known = len(self.authors)
+        removed = self.duplicates_removed
+        built = {name: getattr(self, "_" + name) for name in INCREMENTAL}
+
+        report = AppendReport(self._ingest(filenames, streaming, processes))
+        report.new_authors = len(self.authors) - known
+        if self._superseded:
+            # KEEP_LAST dropped publications that were loaded before, which
+            # renumbers the ones after them: rebuild as read() does
+            self._drop_superseded()
+            self._coauthor_graph = CoauthorGraph.from_publications(self.publications, len(self.authors))
+            self._name_index = NameIndex(self.authors.names, self.author_idx)
+            report.publications = len(self.publications) - start
+            report.rebuilt = True
+            report.aggregates = {"publications", "authors"} | set(INCREMENTAL)
+            return report
+
+        delta = self.publications.tail(start)
+        na = len(self.authors)
+        report.publications = len(delta)
+        if len(delta) == 0:
+            for name, structure in built.items():
+                setattr(self, "_" + name, structure)
+            self.cache.carry(version, self.version, lambda key: True)
+            return report
+
+        graph = built["coauthor_graph"]
+        if graph is not None:
+            self._coauthor_graph = graph.merge(CoauthorGraph.from_publications(delta, na), na)
+        if built["coauthor_index"] is not None:
+            self._coauthor_index = built["coauthor_index"].merge(
+                TemporalCoauthorIndex.from_publications(delta, na), base, na)
+        if built["count_cube"] is not None:
+            self._count_cube = built["count_cube"].merge(CountCube.from_publications(delta, na), base, na)
+        if built["publication_counts"] is not None:
+            self._publication_counts = self._add_rows(built["publication_counts"],
+                                                      self._publication_count_matrix(delta, na))
+        if built["appearance"] is not None:
+            self._appearance = self._add_rows(built["appearance"], self._appearance_matrix(delta, na))
+        if built["name_index"] is not None:
+            self._name_index = built["name_index"].extend(known) if na > known else built["name_index"]
+
+        # papers with at least two distinct authors add co-author pairs
+        entries = np.unique(delta.authorship_publications() * max(na, 1) + delta.author_ids.values)
+        shared = np.bincount(entries // max(na, 1), minlength=len(delta)) > 1
+        report.authors = frozenset(self.authors.name_list(np.unique(delta.author_ids.values).tolist()))
+        report.pair_cells = set(zip(delta.year.values[shared].tolist(), delta.pub_type.values[shared].tolist()))
+        report.new_edges = (len(self._coauthor_graph.neighbours) > len(graph.neighbours)
+                            if graph is not None else bool(report.pair_cells))
+        report.aggregates = {"publications", "coauthor_graph", "count_cube", "publication_counts", "appearance"}
+        if report.pair_cells:
+            report.aggregates.add("coauthor_index")
+        if report.new_authors:
+            report.aggregates |= {"authors", "name_index"}
+
+        self.cache.carry(version, self.version, lambda key: not report.affects(key))
+        return report
+
+    def _ingest(self, filenames, streaming, processes):
+        # parse filenames into the store; False if any of them failed
+        if isinstance(filenames, str):
+            filenames = [filenames]
 
-    def get_coauthor_data(self, start_year, end_year, pub_type):
-        coauthors = {}
-        for p in self.publications:
-            if ((start_year is None or p.year >= start_year) and
-                    (end_year is None or p.year <= end_year) and
-                    (pub_type == 4 or pub_type == p.pub_type)):
-                for a in p.authors:
-                    for a2 in p.authors:
-                        if a != a2:
-                            try:
-                                coauthors[a].add(a2)
-                            except KeyError:
-                                coauthors[a] = set([a2])
-
-        def display(db, coauthors, author_id):
-            return f"{db.authors[author_id].name} {len(coauthors[author_id])}"
-
-        header = ("Author", "Co-Authors")
-        data = []
-        for a in coauthors:
-            data.append([display(self, coauthors, a),
-                         ", ".join([
-                             display(self, coauthors, ca) for ca in coauthors[a]])])
+        valid = True
+        if processes != 1:
+            for result in ingest.read_parallel(filenames, processes):
+                self._merge_columns(result)
+                self.ingest_stats.append(result["stats"])
+                print(result["stats"])
+                valid = valid and result["ok"]
+        else:
+            for file in filenames:
+                before = len(self.publications)
+                # listed before parsing so that progress can be followed
+                stats = ingest.IngestStats(file, "streaming" if streaming else "sax")
+                self.ingest_stats.append(stats)
+                if streaming:
+                    ok = ingest.StreamingReader(self).read(file, stats)
+                else:
+                    ok = self._read_sax(file, stats)
+                stats.finish(len(self.publications) - before)
+                print(stats)
+                valid = valid and ok
+        return valid
 
-        return header, data
+    def _read_sax(self, filename, stats=None):
+        handler = DocumentHandler(self)
+        parser = xml.sax.make_parser()
+        parser.setContentHandler(handler)
+        valid = True
+        infile = open(filename, "r")
+        try:
+            parser.parse(infile if stats is None else ingest.ProgressFile(infile, stats))
+        except xml.sax.SAXException as e:
+            valid = False
+            print("Error reading file (" + e.getMessage() + ")")
+        infile.close()
+        return valid
 
-    def get_average_authors_per_publication(self, av):
-        header = ("Conference Paper", "Journal", "Book", "Book Chapter", "All Publications")
+    def save_snapshot(self, directory, filenames):
+        snapshot.save(self, directory, filenames)
 
-        auth_per_pub = [[], [], [], []]
+    def load_snapshot(self, directory, filenames):
+        return snapshot.load(self, directory, filenames)
 
-        for p in self.publications:
-            auth_per_pub[p.pub_type].append(len(p.authors))
+    def restore(self, publications, authors, min_year, max_year, coauthor_graph, name_index):
+        self.publications = publications
+        self.authors = authors
+        self.author_idx = authors.ids
+        self.min_year = min_year
+        self.max_year = max_year
+        self._invalidate(authors=True)
+        self._coauthor_graph = coauthor_graph
+        self._name_index = name_index
+
+    @property
+    def etag(self):
+        # changes whenever the data does, and differs between Database objects
+        return f"{self._instance}-{self.version}"
+
+    def get_table(self, name, *args):
+        # result of the query method name(*args) as a table that can be sorted
+        # and paged on the server
+        if name not in PAGED_TABLES:
+            raise ValueError
+        if name == "get_coauthor_data":
+            return self.get_coauthor_table(*args)
+        return self._sorted_table(name, *args)
 
-        func = Stat.FUNC[av]
+    @cached
+    def _sorted_table(self, name, *args):
+        return SortedTable(*getattr(self, name)(*args))
 
-        data = [func(auth_per_pub[i]) for i in np.arange(4)] + [func(list(itertools.chain(*auth_per_pub)))]
-        return header, data
+    @cached
+    def get_all_authors(self):
+        return self.author_idx.keys()
 
-    def get_average_publications_per_author(self, av):
+    @cached
+    def get_coauthor_data(self, start_year, end_year, pub_type):
+        table = self.get_coauthor_table(start_year, end_year, pub_type)
+        return table.header, table.rows_at(range(len(table)))
+
+    def get_coauthor_table(self, start_year, end_year, pub_type):
+        # The co-author table of the period as a CoauthorTable. The one for
+        # the whole dataset is larger than the query cache allows, so it is
+        # kept here until the data changes.
+        if not self.coauthor_index.spans_all(start_year, end_year, None if pub_type == 4 else pub_type):
+            return self._coauthor_table(start_year, end_year, pub_type)
+        table = self._whole_coauthor_table
+        if table is None:
+            table = self._whole_coauthor_table = self._build_coauthor_table(start_year, end_year, pub_type)
+        return table
+
+    @cached
+    def _coauthor_table(self, start_year, end_year, pub_type):
+        return self._build_coauthor_table(start_year, end_year, pub_type)
+
+    def _build_coauthor_table(self, start_year, end_year, pub_type):
+        # rows follow the order in which authors first appear
+        index = self.coauthor_index
+        src, dst, order = index.query(start_year, end_year, None if pub_type == 4 else pub_type)
+        na = len(self.authors)
+        if src is index.edge_src:
+            # the whole dataset, whose edges the co-author graph already holds
+            graph = self.coauthor_graph
+            ids, bounds, neighbours, degree = np.arange(na), graph.offsets, graph.neighbours, graph.degree
+        else:
+            # the period's graph over the authors in it; every edge is there
+            # in both directions
+            pairs = np.unique(src.astype(np.int64) * na + dst)
+            ids = np.unique(src)
+            degree = np.bincount(np.searchsorted(ids, pairs // na), minlength=len(ids))
+            bounds = np.concatenate(([0], np.cumsum(degree)))
+            neighbours = np.searchsorted(ids, pairs % na)
+
+        sort = np.argsort(src, kind="stable")
+        src = src[sort]
+        starts = np.flatnonzero(np.concatenate(([True], src[1:] != src[:-1])))[:len(src)]
+        earliest = np.minimum.reduceat(order[sort], starts) if len(src) else order[:0]
+        sources = np.searchsorted(ids, src[starts])[np.argsort(earliest, kind="stable")]
+        return CoauthorTable(self.authors.name_list, ids, sources, bounds, neighbours, degree)
+
+    @cached
+    def get_averages(self):
+        # All four tables of the averages page from one shared set of
+        # aggregates. tables[AverageTable.*][av] holds the per-type results
+        # of the statistic Stat.FUNC[av].
         header = ("Conference Paper", "Journal", "Book", "Book Chapter", "All Publications")
 
-        pub_per_auth = np.zeros((len(self.authors), 4))
-
-        for p in self.publications:
-            for a in p.authors:
-                pub_per_auth[a, p.pub_type] += 1
+        ny = int(self.max_year) - int(self.min_year) + 1
+        auth_per_pub = self.publications.author_counts()
+        pub_type = self.publications.pub_type.values.astype(np.int64)
+        pub_year = self.publications.year.values - self.min_year
 
-        func = Stat.FUNC[av]
+        sizes, bounds = self._group(auth_per_pub, pub_type, 4)
+        auth_groups = [sizes[bounds[t]:bounds[t + 1]] for t in range(4)] + [auth_per_pub]
 
-        data = [func(pub_per_auth[:, i]) for i in np.arange(4)] + [func(pub_per_auth.sum(axis=1))]
-        return header, data
+        ystats = np.bincount(pub_year * 4 + pub_type, minlength=ny * 4).reshape(ny, 4)
+        ystats = np.column_stack((ystats, ystats.sum(axis=1)))
 
-    def get_average_publications_in_a_year(self, av):
-        header = ("Conference Paper",
-                  "Journal", "Book", "Book Chapter", "All Publications")
+        yauth = self.count_cube.authors_per_year(self.count_cube.years - self.min_year, ny)
 
-        ystats = np.zeros((int(self.max_year) - int(self.min_year) + 1, 4))
+        tables = [None] * 4
+        tables[AverageTable.AUTHORS_PER_PUBLICATION] = [[func(g) for g in auth_groups] for func in Stat.FUNC]
+        tables[AverageTable.PUBLICATIONS_PER_AUTHOR] = [func(self.publication_counts) for func in Stat.FUNC]
+        tables[AverageTable.PUBLICATIONS_IN_A_YEAR] = [func(ystats) for func in Stat.FUNC]
+        tables[AverageTable.AUTHORS_IN_A_YEAR] = [func(yauth) for func in Stat.FUNC]
+        return header, tables
 
-        for p in self.publications:
-            ystats[p.year - self.min_year][p.pub_type] += 1
+    def get_average_authors_per_publication(self, av):
+        header, tables = self.get_averages()
+        return header, tables[AverageTable.AUTHORS_PER_PUBLICATION][av]
 
-        func = Stat.FUNC[av]
+    def get_average_publications_per_author(self, av):
+        header, tables = self.get_averages()
+        return header, tables[AverageTable.PUBLICATIONS_PER_AUTHOR][av]
 
-        data = [func(ystats[:, i]) for i in np.arange(4)] + [func(ystats.sum(axis=1))]
-        return header, data
+    def get_average_publications_in_a_year(self, av):
+        header, tables = self.get_averages()
+        return header, tables[AverageTable.PUBLICATIONS_IN_A_YEAR][av]
 
     def get_average_authors_in_a_year(self, av):
-        header = ("Conference Paper",
-                  "Journal", "Book", "Book Chapter", "All Publications")
-
-        yauth = [[set(), set(), set(), set(), set()] for _ in range(int(self.min_year), int(self.max_year) + 1)]
-
-        for p in self.publications:
-            for a in p.authors:
-                yauth[p.year - self.min_year][p.pub_type].add(a)
-                yauth[p.year - self.min_year][4].add(a)
-
-        ystats = np.array([[len(S) for S in y] for y in yauth])
-
-        func = Stat.FUNC[av]
-
-        data = [func(ystats[:, i]) for i in np.arange(5)]
-        return header, data
+        header, tables = self.get_averages()
+        return header, tables[AverageTable.AUTHORS_IN_A_YEAR][av]
 
+    @cached
     def get_publication_summary_average(self, av):
         header = ("Details", "Conference Paper",
                   "Journal", "Book", "Book Chapter", "All Publications")
 
-        pub_per_auth = np.zeros((len(self.authors), 4))
-        auth_per_pub = [[], [], [], []]
-
-        for p in self.publications:
-            auth_per_pub[p.pub_type].append(len(p.authors))
-            for a in p.authors:
-                pub_per_auth[a, p.pub_type] += 1
+        auth_per_pub = self.publications.author_counts()
+        pub_type = self.publications.pub_type.values
 
         name = Stat.STR[av]
         func = Stat.FUNC[av]
 
         data = [
             [name + " authors per publication"]
-            + [func(auth_per_pub[i]) for i in np.arange(4)]
-            + [func(list(itertools.chain(*auth_per_pub)))],
-            [name + " publications per author"]
-            + [func(pub_per_auth[:, i]) for i in np.arange(4)]
-            + [func(pub_per_auth.sum(axis=1))]]
+            + [func(auth_per_pub[pub_type == i]) for i in np.arange(4)]
+            + [func(auth_per_pub)],
+            [name + " publications per author"] + func(self.publication_counts)]
         return header, data
 
+    @cached
     def get_publication_summary(self):
         header = ("Details", "Conference Paper",
                   "Journal", "Book", "Book Chapter", "Total")
 
-        plist = [0, 0, 0, 0]
-        alist = [set(), set(), set(), set()]
-
-        for p in self.publications:
-            plist[p.pub_type] += 1
-            for a in p.authors:
-                alist[p.pub_type].add(a)
-        # create union of all authors
-        ua = alist[0] | alist[1] | alist[2] | alist[3]
+        _, types, authors = self._authorship_columns()
+        plist = np.bincount(self.publications.pub_type.values, minlength=4).tolist()
+        alist = self._count_distinct(types, authors, 4).tolist()
+        # size of the union of all authors
+        ua = len(np.unique(authors))
 
         data = [
             ["Number of publications"] + plist + [sum(plist)],
-            ["Number of authors"] + [len(a) for a in alist] + [len(ua)]]
+            ["Number of authors"] + alist + [ua]]
         return header, data
 
+    @cached
     def get_average_authors_per_publication_by_author(self, av):
         header = ("Author", "Number of conference papers",
                   "Number of journals", "Number of books",
                   "Number of book chapers", "All publications")
 
-        astats = [[[], [], [], []] for _ in range(len(self.authors))]
-        for p in self.publications:
-            for a in p.authors:
-                astats[a][p.pub_type].append(len(p.authors))
+        _, types, authors = self._authorship_columns()
+        sizes = np.repeat(self.publications.author_counts(), self.publications.author_counts())
+        sizes, bounds = self._group(sizes, authors.astype(np.int64) * 4 + types, len(self.authors) * 4)
 
         func = Stat.FUNC[av]
 
-        data = [[self.authors[i].name]
-                + [func(L) for L in astats[i]]
-                + [func(list(itertools.chain(*astats[i])))]
-                for i in range(len(astats))]
+        names = self.authors.name_list()
+        data = [[names[i]]
+                + [func(sizes[bounds[4 * i + t]:bounds[4 * i + t + 1]]) for t in range(4)]
+                + [func(sizes[bounds[4 * i]:bounds[4 * i + 4]])]
+                for i in range(len(names))]
         return header, data
 
+    @cached
     def get_publications_by_author(self):
         header = ("Author", "Number of conference papers",
                   "Number of journals", "Number of book",
                   "Number of book chapers", "Total")
 
-        astats = [[0, 0, 0, 0] for _ in range(len(self.authors))]
-        for p in self.publications:
-            for a in p.authors:
-                astats[a][p.pub_type] += 1
+        astats = self._publications_per_author()
+        totals = astats.sum(axis=1).tolist()
+        astats = astats.tolist()
 
-        data = [[self.authors[i].name] + astats[i] + [sum(astats[i])]
+        names = self.authors.name_list()
+        data = [[names[i]] + astats[i] + [totals[i]]
                 for i in range(len(astats))]
         return header, data
 
+    @cached
     def get_publications_by_author_year(self):
         header = ("Author Name", "Year", "Number of conference papers",
                   "Number of journals", "Number of books",
                   "Number of book chapters", "Total")
 
-        aystats = {}
-        for p in self.publications:
-            for a in p.authors:
-                key = self.authors[a].name + '#' + str(p.year)
-                if aystats.get(key) is None:
-                    aystats[key] = [0, 0, 0, 0]
-                aystats[key][p.pub_type] += 1
-        data = [[ay.split('#')[0]] + [ay.split('#')[1]] + aystats[ay] + [sum(aystats[ay])] for ay in aystats]
+        cube = self.count_cube
+        order = np.argsort(cube.first)
+        authors = cube.authors[order].tolist()
+        years = cube.years[order].tolist()
+        counts = cube.counts[order].tolist()
+
+        names = self.authors.name_list()
+        data = [[names[authors[k]], str(years[k])] + counts[k] + [sum(counts[k])]
+                for k in range(len(order))]
         return header, data
 
-    def get_author_pub_by_year(self, author_name):
+    @cached
+    def get_author_pub_by_year(self, author_name, start_year=None, end_year=None):
         header = ("Author Name", "Year", "Number of conference papers",
                   "Number of journals", "Number of books",
                   "Number of book chapters", "Total Number of Publications")
 
-        author_list = [i.name for i in self.authors]
-
-        author_list_sorted = Database.partial_search_by_author_name(author_list, author_name)
+        author_list_sorted = self.search_author_names(author_name)
 
         if len(author_list_sorted) == 0:
             raise ValueError
 
+        cube = self.count_cube
         data = []
-        _, pub_stat = self.get_publications_by_author_year()
-
         for i in author_list_sorted:
-            single_author_data = []
-            for j in range(len(pub_stat)):
-                if pub_stat[j][0] == i:
-                    single_author_data.append(pub_stat[j])
-            single_author_data.sort(key=lambda t: t[1])
-            data += single_author_data
+            lo, hi = cube.cells_of(self.author_idx[i], start_year, end_year)
+            for year, counts in zip(cube.years[lo:hi].tolist(), cube.counts[lo:hi].tolist()):
+                data.append([i, str(year)] + counts + [sum(counts)])
 
         return header, data
 
+    @cached
     def get_appearance_by_author(self):
         header = ("Author Name", "First author", "Last author", "Sole author")
 
-        astats = [[0, 0, 0] for _ in range(len(self.authors))]
+        astats = self.appearance[:, ALL_TYPES].tolist()
 
-        for i in range(len(self.authors)):
-            for p in self.publications:
-                if (self.author_idx[self.authors[i].name] == p.authors[0]) and (len(p.authors) == 1):
-                    astats[i][2] += 1
-                else:
-                    if self.author_idx[self.authors[i].name] == p.authors[0]:
-                        astats[i][0] += 1
-
-                    if self.author_idx[self.authors[i].name] == p.authors[-1]:
-                        astats[i][1] += 1
-
-        data = [[self.authors[i].name] + astats[i] for i in range(len(astats))]
+        names = self.authors.name_list()
+        data = [[names[i]] + astats[i] for i in range(len(astats))]
 
         return header, data
     
+    @cached
     def get_appearance_by_author_by_publications(self, author_name=None):
         header_publication = ("Conference Papers", "Journals", "Books", "Book Chapers", "All Types")
         header_author = ("Author Name", "First author", "Last author", "Sole author")
         
-        author_list = [i.name for i in self.authors] 
-
-        astats = [[[0, 0, 0] for _ in range(len(author_list))] for t in range(len(PublicationType)+1)]
+        author_list = self.authors.names
 
-        for i in range(len(author_list)):
-            for p in self.publications:
-                p_type = p.pub_type
-                if (self.author_idx[author_list[i]] == p.authors[0]) and (len(p.authors) == 1):
-                    astats[p_type][i][2] += 1
-                    astats[-1][i][2] += 1
-                else:
-                    if self.author_idx[author_list[i]] == p.authors[0]:
-                        astats[p_type][i][0] += 1
-                        astats[-1][i][0] += 1
-
-                    if self.author_idx[author_list[i]] == p.authors[-1]:
-                        astats[p_type][i][1] += 1
-                        astats[-1][i][1] += 1
-
-        data = [([[author_list[i]] + astats[t][i] for i in range(len(astats[t]))]) for t in range(len(astats))]
-
-        def search(author_name):
-            author_found = False
-            author_name_list = Database.partial_search_by_author_name(author_list, author_name)
-            data_author = [[] for i in range(len(PublicationType)+1)]
-            for k in author_name_list:
-                for i in range(len(data)):
-                    for j in range(len(data[i])):                   
-                        if data[i][j][0] == k:
-                            data_author[i].append(data[i][j])
-                            author_found = True
-            
-            if author_found == False:
+        if author_name is None:
+            ids = range(len(author_list))
+        else:
+            ids = [self.author_idx[k] for k in self.search_author_names(author_name)]
+            if len(ids) == 0:
                 raise ValueError
-            
-            return data_author
-            
-        if author_name is not None:
-            data = search(author_name)
-        
+
+        astats = self.appearance[ids].tolist()
+        data = [[[author_list[a]] + astats[i][t] for i, a in enumerate(ids)] for t in range(ALL_TYPES + 1)]
+
         return header_publication, header_author, data
     
-    def partial_search_by_author_name(author_name_list, author_name):
-        
-        author_list = []
-        
-        if author_name is not None and len(author_name) > 0:       
-            for i in range(len(author_name_list)):
-                author_found = False
-                full_name = author_name_list[i]
-                full_name_l = full_name.lower()
-                input_name_l = author_name.lower()
-                partial_name = full_name_l.split()
-                if author_name == full_name:
-                    author_list.append((author_name, 0))
-                    author_found = True
-                else:
-                    full_name_l = full_name.lower()
-                    input_name_l = author_name.lower()
-                    partial_name = full_name_l.split()
-                    for j in range(len(partial_name)):                
-                        if input_name_l == partial_name[j]:
-                            if j == len(partial_name) - 1:
-                                author_list.append((full_name, 1))
-                            elif j == 0:
-                                author_list.append((full_name, 3))
-                            else:
-                                author_list.append((full_name, 5))
-                            author_found = True
-                            break
-                        
-                    if author_found == False:
-                        if input_name_l in partial_name[-1][0:len(input_name_l)]:
-                            author_list.append((full_name, 2))
-                            author_found = True
-                        elif input_name_l in partial_name[0][0:len(input_name_l)]:
-                            author_list.append((full_name, 4))
-                            author_found = True
-                        elif input_name_l in full_name_l:
-                            author_list.append((full_name, 6))
-                            author_found = True
-                          
-        author_list = sorted(author_list, key=lambda p: (p[1], p[0].split()[-1], p[0].split()[0]))   
-        author_list_sorted = [i[0] for i in author_list]
-        return author_list_sorted
-
+    def get_author_profiles(self, author_ids):
+        # profiles of many authors at once, all read from the shared per-author
+        # aggregates, in the order of author_ids
+        ids = np.asarray(author_ids, dtype=np.int64)
+        publications = self.publication_counts[ids].tolist()
+        coauthors = self.coauthor_graph.degree[ids].tolist()
+        appearance = self.appearance[ids].tolist()
+        names = self.authors.name_list(ids.tolist())
+        return [AuthorProfile(names[i], publications[i], coauthors[i], appearance[i])
+                for i in range(len(names))]
+
+    @cached
     def get_author_info_by_search(self, author_name):
         header = ("Author", "Number of conference papers",
                   "Number of journals", "Number of books",
                   "Number of book chapters", "Number of Publications", "Number of co-authors",
                   "Number of first author", "Number of last author")
         
-        author_list = [i.name for i in self.authors]
-
-        author_list_sorted = Database.partial_search_by_author_name(author_list, author_name)
+        author_list_sorted = self.search_author_names(author_name)
 
         if len(author_list_sorted) == 0:
             raise ValueError
-        
-        data = []
-        
-        for i in author_list_sorted:
-            index = self.author_idx[i]
-    
-            _, pub_stat = self.get_publications_by_author()
-            coauthors = {}
-            for p in self.publications:
-                for a in p.authors:
-                    for a2 in p.authors: 
-                        if a != a2:
-                            try:
-                                coauthors[a].add(a2)
-                            except KeyError:
-                                coauthors[a] = set([a2])
-            co_author_stat = list(coauthors[index])
-            #_, co_author_stat = self.get_coauthor_data()
-            _, app_stat = self.get_appearance_by_author()
-    
-            data.append([self.authors[index].name] + list(pub_stat[index][1:]) + [len(co_author_stat)] + list(app_stat[index][1:3]))
-            
+
+        profiles = self.get_author_profiles([self.author_idx[i] for i in author_list_sorted])
+        data = [[p.name] + p.publications + [p.coauthors] + p.appearance[ALL_TYPES][:2] for p in profiles]
+
         return header, data
 
+    @cached
     def get_single_author_info(self, author_name):
         header = ("Number of publications", "Number of times first author", 
                   "Number of times last author", "Number of times sole author", 
@@ -457,112 +572,85 @@ class Database:
         def display(stat):
             return f"overall: {stat[0]}, journal articles: {stat[1]}, conference papers: {stat[2]}, books: {stat[3]}, book chapters: {stat[4]}"
 
-        # Publication stat
-        _, pub_stat = self.get_author_info_by_search(author_name)
-        
-        pub_stat = pub_stat[0]
-        
-        num_of_pub = [pub_stat[5], pub_stat[2], pub_stat[1], pub_stat[3], pub_stat[4]]
-
-        # First author
-        _, fa_stat_oa = self.get_appearance_by_author()
-        _, _, fa_stat = self.get_appearance_by_author_by_publications()
-        num_of_fa = [fa_stat_oa[index][1], fa_stat[1][index][1], fa_stat[0][index][1], fa_stat[2][index][1], fa_stat[3][index][1]]
-
-        # Last author
-        num_of_la = [fa_stat_oa[index][2], fa_stat[1][index][2], fa_stat[0][index][2], fa_stat[2][index][2], fa_stat[3][index][2]]
+        profile = self.get_author_profiles([index])[0]
+        order = [ALL_TYPES, Publication.JOURNAL, Publication.CONFERENCE_PAPER, Publication.BOOK, Publication.BOOK_CHAPTER]
 
-        # Sole author
-        num_of_sa = [fa_stat_oa[index][3], fa_stat[1][index][3], fa_stat[0][index][3], fa_stat[2][index][3], fa_stat[3][index][3]]
-
-        # Co-authors
-        num_of_co = pub_stat[6]
+        num_of_pub = [profile.publications[t] for t in order]
+        num_of_fa, num_of_la, num_of_sa = [[profile.appearance[t][role] for t in order] for role in range(3)]
 
         data = []
         data.append(display(num_of_pub))
         data.append(display(num_of_fa))
         data.append(display(num_of_la))
         data.append(display(num_of_sa))
-        data.append(str(num_of_co))
+        data.append(str(profile.coauthors))
 
         return header, data
 
+    @cached
     def get_average_authors_per_publication_by_year(self, av):
         header = ("Year", "Conference papers",
                   "Journals", "Books",
                   "Book chapers", "All publications")
 
-        ystats = {}
-        for p in self.publications:
-            try:
-                ystats[p.year][p.pub_type].append(len(p.authors))
-            except KeyError:
-                ystats[p.year] = [[], [], [], []]
-                ystats[p.year][p.pub_type].append(len(p.authors))
+        years, first, inverse = np.unique(self.publications.year.values, return_index=True, return_inverse=True)
+        sizes, bounds = self._group(self.publications.author_counts(),
+                                    inverse * 4 + self.publications.pub_type.values, len(years) * 4)
 
         func = Stat.FUNC[av]
 
-        data = [[y]
-                + [func(L) for L in ystats[y]]
-                + [func(list(itertools.chain(*ystats[y])))]
-                for y in ystats]
+        data = [[int(years[y])]
+                + [func(sizes[bounds[4 * y + t]:bounds[4 * y + t + 1]]) for t in range(4)]
+                + [func(sizes[bounds[4 * y]:bounds[4 * y + 4]])]
+                for y in np.argsort(first)]
         return header, data
 
+    @cached
     def get_publications_by_year(self):
         header = ("Year", "Number of conference papers",
                   "Number of journals", "Number of books",
                   "Number of book chapers", "Total")
 
-        ystats = {}
-        for p in self.publications:
-            try:
-                ystats[p.year][p.pub_type] += 1
-            except KeyError:
-                ystats[p.year] = [0, 0, 0, 0]
-                ystats[p.year][p.pub_type] += 1
+        years, first, inverse = np.unique(self.publications.year.values, return_index=True, return_inverse=True)
+        ystats = np.bincount(inverse * 4 + self.publications.pub_type.values,
+                             minlength=len(years) * 4).reshape(-1, 4).tolist()
 
-        data = [[y] + ystats[y] + [sum(ystats[y])] for y in ystats]
+        data = [[int(years[y])] + ystats[y] + [sum(ystats[y])] for y in np.argsort(first)]
         return header, data
 
+    @cached
     def get_average_publications_per_author_by_year(self, av):
         header = ("Year", "Conference papers",
                   "Journals", "Books",
                   "Book chapers", "All publications")
 
-        ystats = {}
-        for p in self.publications:
-            try:
-                s = ystats[p.year]
-            except KeyError:
-                s = np.zeros((len(self.authors), 4))
-                ystats[p.year] = s
-            for a in p.authors:
-                s[a][p.pub_type] += 1
+        na = len(self.authors)
+        years, first = np.unique(self.publications.year.values, return_index=True)
+        cube = self.count_cube
+        cells, bounds = self._group(np.arange(len(cube)), np.searchsorted(years, cube.years), len(years))
 
         func = Stat.FUNC[av]
 
-        data = [[y]
-                + [func(ystats[y][:, i]) for i in np.arange(4)]
-                + [func(ystats[y].sum(axis=1))]
-                for y in ystats]
+        data = []
+        for y in np.argsort(first):
+            c = cells[bounds[y]:bounds[y + 1]]
+            s = np.zeros((na, 5), dtype=np.int64)
+            s[cube.authors[c], :4] = cube.counts[c]
+            s[:, 4] = s[:, :4].sum(axis=1)
+            data.append([int(years[y])] + func(s))
         return header, data
 
+    @cached
     def get_author_totals_by_year(self):
         header = ("Year", "Number of conference papers",
                   "Number of journals", "Number of books",
                   "Number of book chapers", "Total")
 
-        ystats = {}
-        for p in self.publications:
-            try:
-                s = ystats[p.year][p.pub_type]
-            except KeyError:
-                ystats[p.year] = [set(), set(), set(), set()]
-                s = ystats[p.year][p.pub_type]
-            for a in p.authors:
-                s.add(a)
-        data = [[y] + [len(s) for s in ystats[y]] + [len(ystats[y][0] | ystats[y][1] | ystats[y][2] | ystats[y][3])]
-                for y in ystats]
+        years, first = np.unique(self.publications.year.values, return_index=True)
+        cube = self.count_cube
+        ystats = cube.authors_per_year(np.searchsorted(years, cube.years), len(years)).tolist()
+
+        data = [[int(years[y])] + ystats[y] for y in np.argsort(first)]
         return header, data
 
     def add_publication(self, pub_type, title, year, authors, key):
@@ -574,20 +662,15 @@ class Database:
             print("    Authors:", ",".join(authors))
             print("    Key: {}".format(key))
             return
+        if self.duplicates != Duplicates.KEEP_ALL and not self._claim_key(key, len(self.publications)):
+            return
         if title is None:
             print(f"Warning: adding publication with missing title "
                   f"[ {PublicationType[pub_type]} {year} ({','.join(authors)}) ]")
-        idlist = []
-        for a in authors:
-            try:
-                idlist.append(self.author_idx[a])
-            except KeyError:
-                a_id = len(self.authors)
-                self.author_idx[a] = a_id
-                idlist.append(a_id)
-                self.authors.append(Author(a))
-        self.publications.append(
-            Publication(pub_type, title, year, idlist, key))
+        na = len(self.authors)
+        idlist = [self.authors.add(a) for a in authors]
+        self.publications.append(pub_type, title, year, idlist, key)
+        self._invalidate(authors=len(self.authors) != na)
         if (len(self.publications) % 100000) == 0:
             print(
                 f"Adding publication number {len(self.publications)} "
@@ -598,96 +681,246 @@ class Database:
         if self.max_year is None or year > self.max_year:
             self.max_year = year
 
+    def _invalidate(self, authors=False):
+        # Drop every structure derived from the publications, and with authors
+        # also those derived from the author table, and start a new data
+        # version, which retires the cached query results.
+        self._coauthor_graph = None
+        self._coauthor_index = None
+        self._appearance = None
+        self._publication_counts = None
+        self._count_cube = None
+        self._whole_coauthor_table = None
+        if authors:
+            self._name_index = None
+            self._staff_mask = None
+        self.version += 1
+
+    @property
+    def key_index(self):
+        if self._key_index is None:
+            self._key_index = {k: i for i, k in enumerate(self.publications.keys)}
+        return self._key_index
+
+    def _claim_key(self, key, pub_id, policy=None):
+        # Record that publication pub_id carries key. Returns False if it is a
+        # duplicate that must be skipped; with KEEP_LAST the older copy is
+        # dropped instead, once loading finishes. policy defaults to the
+        # duplicates policy of the Database.
+        known = self.key_index.get(key)
+        if known is not None:
+            self.duplicates_removed += 1
+            if (self.duplicates if policy is None else policy) == Duplicates.KEEP_FIRST:
+                return False
+            self._superseded.append(known)
+        self._key_index[key] = pub_id
+        return True
+
+    def _drop_superseded(self):
+        if not self._superseded:
+            return
+        keep = np.ones(len(self.publications), dtype=bool)
+        keep[self._superseded] = False
+        self.publications.keep(keep)
+        self._superseded = []
+        self._key_index = None
+        self._invalidate()
+
+    def _merge_columns(self, columns):
+        # append publications parsed elsewhere, mapping their local author
+        # ids to global ones in order of first appearance
+        keep = np.ones(len(columns["keys"]), dtype=bool)
+        if self.duplicates != Duplicates.KEEP_ALL:
+            pub_id = len(self.publications)
+            for i, key in enumerate(columns["keys"]):
+                if self._claim_key(key, pub_id):
+                    pub_id += 1
+                else:
+                    keep[i] = False
+        counts = np.diff(columns["author_offsets"])[keep]
+        local_ids = columns["author_ids"][np.repeat(keep, np.diff(columns["author_offsets"]))]
+
+        used, first = np.unique(local_ids, return_index=True)
+        ids = np.zeros(len(columns["names"]), dtype=np.int32)
+        for local in used[np.argsort(first)].tolist():
+            ids[local] = self.authors.add(columns["names"][local])
+        self.publications.extend(columns["pub_type"][keep], columns["year"][keep],
+                                 np.concatenate(([0], np.cumsum(counts))), ids[local_ids],
+                                 [t for t, k in zip(columns["titles"], keep) if k],
+                                 [t for t, k in zip(columns["keys"], keep) if k])
+        self._invalidate(authors=True)
+
+        years = columns["year"][keep]
+        if len(years):
+            if self.min_year is None or years.min() < self.min_year:
+                self.min_year = int(years.min())
+            if self.max_year is None or years.max() > self.max_year:
+                self.max_year = int(years.max())
+
+    def _authorship_columns(self):
+        # year, publication type and author id of every authorship entry
+        counts = self.publications.author_counts()
+        return (np.repeat(self.publications.year.values, counts),
+                np.repeat(self.publications.pub_type.values.astype(np.int64), counts),
+                self.publications.author_ids.values)
+
+    def _publications_per_author(self):
+        return self.publication_counts[:, :ALL_TYPES]
+
+    @property
+    def publication_counts(self):
+        # publication_counts[a, t] is the number of publications of type t by
+        # author a, with t == ALL_TYPES for the total
+        if self._publication_counts is None:
+            self._publication_counts = self._publication_count_matrix(self.publications, len(self.authors))
+            self._publication_counts.flags.writeable = False
+        return self._publication_counts
+
+    @staticmethod
+    def _publication_count_matrix(store, na):
+        types = np.repeat(store.pub_type.values.astype(np.int64), store.author_counts())
+        authors = store.author_ids.values.astype(np.int64)
+        counts = np.bincount(authors * 4 + types, minlength=na * 4).reshape(na, 4)
+        return np.concatenate((counts, counts.sum(axis=1, keepdims=True)), axis=1)
+
+    @staticmethod
+    def _add_rows(old, new):
+        # new with the rows of old, a matrix over fewer authors, added in
+        new[:len(old)] += old
+        new.flags.writeable = False
+        return new
+
+    def _count_distinct(self, groups, authors, ngroups):
+        # number of distinct authors within each group
+        na = max(len(self.authors), 1)
+        pairs = np.unique(groups.astype(np.int64) * na + authors)
+        return np.bincount(pairs // na, minlength=ngroups)
+
+    @staticmethod
+    def _group(values, groups, ngroups):
+        # values reordered by group, with bounds[g]:bounds[g + 1] selecting group g
+        order = np.argsort(groups, kind="stable")
+        bounds = np.searchsorted(groups[order], np.arange(ngroups + 1))
+        return values[order], bounds
+
+    @property
+    def appearance(self):
+        # appearance[a, t] holds the first, last and sole author counts of
+        # author a in publications of type t, with t == ALL_TYPES for the total
+        if self._appearance is None:
+            self._appearance = self._appearance_matrix(self.publications, len(self.authors))
+            self._appearance.flags.writeable = False
+        return self._appearance
+
+    @staticmethod
+    def _appearance_matrix(store, na):
+        # one pass over the publications: every publication adds one to a
+        # single (author, type, role) cell
+        nt = len(PublicationType)
+        offsets = store.author_offsets.values
+        authors = store.author_ids.values.astype(np.int64)
+        types = store.pub_type.values.astype(np.int64)
+        sole = np.diff(offsets) == 1
+        shared = ~sole
+        first = authors[offsets[:-1]]
+        last = authors[offsets[1:] - 1]
+        cells = np.concatenate(((first[shared] * nt + types[shared]) * 3,
+                                (last[shared] * nt + types[shared]) * 3 + 1,
+                                (first[sole] * nt + types[sole]) * 3 + 2))
+        counts = np.bincount(cells, minlength=na * nt * 3).reshape(na, nt, 3)
+        return np.concatenate((counts, counts.sum(axis=1, keepdims=True)), axis=1)
+
+    @property
+    def count_cube(self):
+        if self._count_cube is None:
+            self._count_cube = CountCube.from_publications(self.publications, len(self.authors))
+        return self._count_cube
+
+    @property
+    def coauthor_index(self):
+        if self._coauthor_index is None:
+            self._coauthor_index = TemporalCoauthorIndex.from_publications(self.publications, len(self.authors))
+        return self._coauthor_index
+
+    @property
+    def coauthor_graph(self):
+        if self._coauthor_graph is None:
+            self._coauthor_graph = CoauthorGraph.from_publications(self.publications, len(self.authors))
+        return self._coauthor_graph
+
+    @property
+    def name_index(self):
+        if self._name_index is None:
+            self._name_index = NameIndex(self.authors.names, self.author_idx)
+        return self._name_index
+
+    def search_author_names(self, author_name):
+        return self.name_index.search(author_name)
+
+    def finalize(self):
+        # build every derived structure now rather than on first use, e.g.
+        # before forking workers that should share them
+        for name in ("coauthor_graph", "coauthor_index", "count_cube", "publication_counts",
+                     "appearance", "name_index", "staff_mask"):
+            getattr(self, name)
+
     def _get_collaborations(self, author_id, include_self):
+        graph = self.coauthor_graph
         data = {}
-        for p in self.publications:
-            if author_id in p.authors:
-                for a in p.authors:
-                    try:
-                        data[a] += 1
-                    except KeyError:
-                        data[a] = 1
-        if not include_self:
-            del data[author_id]
+        if include_self:
+            data[author_id] = int(graph.paper_counts[author_id])
+        data.update(zip(graph.neighbours_of(author_id).tolist(), graph.weights_of(author_id).tolist()))
         return data
 
+    @cached
     def get_coauthor_details(self, name):
         author_id = self.author_idx[name]
         data = self._get_collaborations(author_id, True)
-        return [(self.authors[key].name, data[key])
-                for key in data]
+        return list(zip(self.authors.name_list(data), data.values()))
 
+    @cached
     def get_network_data(self):
+        graph = self.coauthor_graph
         na = len(self.authors)
 
-        nodes = [[self.authors[i].name, -1] for i in range(na)]
-        links = set()
-        for a in range(na):
-            collab = self._get_collaborations(a, False)
-            nodes[a][1] = len(collab)
-            for a2 in collab:
-                if a < a2:
-                    links.add((a, a2))
+        degree = graph.degree.tolist()
+        nodes = [[name, degree[i]] for i, name in enumerate(self.authors.name_list())]
+        src = np.repeat(np.arange(na), graph.degree)
+        upper = src < graph.neighbours
+        links = set(zip(src[upper].tolist(), graph.neighbours[upper].tolist()))
         return nodes, links
     
     def get_separation(self, author1, author2):
+        header, data, _ = self.get_separation_with_path(author1, author2)
+        return header, data
+
+    @cached
+    def get_separation_with_path(self, author1, author2):
         header = ("Author 1", "Author 2", "Degrees of separation")
         try:
             index1 = self.author_idx[author1]
             index2 = self.author_idx[author2]
         except:
             raise KeyError
-        
-        queue = [index1]
-        separation = ['X']*len(self.authors)
-        separation[index1] = 0
-        visited = [False]*len(self.authors)
-        #initialize separation list
-        
-        while len(queue) != 0: #bfs
-            l = len(queue)
-            for i in range(l):
-                head = queue.pop(0) #pop the first in the queue
-                if visited[head]:
-                    continue
-                visited[head] = True
-                collab = self._get_collaborations(head, False) #get collab
-                for key in collab:
-                    if separation[key] == 'X':
-                        separation[key] = separation[head] + 1
-                    else:
-                        separation[key] = min(separation[head]+1, separation[key])
-                    if not visited[key]:
-                        queue.append(key)
-
-        sep = separation[index2]
-        if sep == 'X':
-            result = sep
+
+        path = self.coauthor_graph.shortest_path(index1, index2)
+        if path is None:
+            result = 'X'
+            path = []
         else:
-            result = sep - 1
+            result = len(path) - 2
         data = [author1, author2, result]
-        return header, data
+        return header, data, self.authors.name_list(path)
 
     def remove_duplicate_publications(self):
-        key_store = []
-
-        print("     There are {} publications got read".format(len(self.publications)))
-        print("---------------")
-        print("     The publication objects read have keys: ")
-        for i in range(len(self.publications)):
-            print("     Title: {}       Key: {}".format(self.publications[i].title, self.publications[i].key))
-        print("---------------")
-        for i in range(len(self.publications)-1, -1, -1):
-            if self.publications[i].key not in key_store:
-                key_store.append(self.publications[i].key)
-            elif self.publications[i].key in key_store:
-                self.publications.remove(self.publications[i])
-                print("     Publication number {} is duplicated and deleted".format(i+1))
-
-        print("---------------")
-        print("     The publication objects read now have keys: ")
-        for i in range(len(self.publications)):
-            print("     Title: {}       Key: {}".format(self.publications[i].title, self.publications[i].key))
+        # apply Duplicates.KEEP_LAST to the publications already loaded, as
+        # ingest does; returns how many were dropped
+        removed = self.duplicates_removed
+        self._key_index = {}
+        for pub_id, key in enumerate(self.publications.keys):
+            self._claim_key(key, pub_id, Duplicates.KEEP_LAST)
+        self._drop_superseded()
+        return self.duplicates_removed - removed
 
     def get_external_coauthor(self, author_name):
         header = ("Number of external co-authors", "List of external co-authors")
@@ -696,25 +929,47 @@ class Database:
         except:
             raise KeyError
 
-        #staff = get_staff()
-        with open('src/comp62521/static/CS-staff.txt') as f:
-            staffstr=f.read()
-        stafflist = staffstr.split('\n')
-
-        collab = self._get_collaborations(index, False)
-        excount = 0
-        exlist = []
-        for key in collab:
-            name = self.authors[key].name
-            if name not in stafflist:
-                excount+=1
-                exlist.append(name)
-
+        neighbours = self.coauthor_graph.neighbours_of(index)
+        exlist = self.authors.name_list(neighbours[~self.staff_mask[neighbours]].tolist())
         exlist.sort(key=lambda x: x.split()[-1])
-        data = [excount, exlist]
-        
+        data = [len(exlist), exlist]
+
         return header, data
 
+    @property
+    def staff_mask(self):
+        # True for the authors on the staff roster. Author ids only grow between
+        # reads, so the mask is rebuilt when the roster file changes or new
+        # authors have been added.
+        self.staff.refresh()
+        if (self._staff_mask is None or self._staff_version != self.staff.version
+                or len(self._staff_mask) != len(self.authors)):
+            self._staff_mask = self.staff.mask(self.authors)
+            self._staff_version = self.staff.version
+        return self._staff_mask
+
+    def get_external_collaboration(self, author_names=None):
+        # internal (staff) and external co-author counts of every author, or
+        # of author_names, in one pass over the co-author graph
+        if author_names is None:
+            ids = np.arange(len(self.authors))
+        else:
+            ids = np.array([self.author_idx[n] for n in author_names], dtype=np.int64)
+        return self._collaboration_table(ids)
+
+    def get_staff_collaboration(self):
+        # the same for the staff on the roster who appear in the data
+        return self._collaboration_table(np.flatnonzero(self.staff_mask))
+
+    def _collaboration_table(self, ids):
+        header = ("Author", "Internal co-authors", "External co-authors", "All co-authors")
+        offsets = self.coauthor_graph.offsets
+        staff = np.concatenate(([0], np.cumsum(self.staff_mask[self.coauthor_graph.neighbours])))
+        internal = (staff[offsets[ids + 1]] - staff[offsets[ids]]).tolist()
+        total = (offsets[ids + 1] - offsets[ids]).tolist()
+        names = self.authors.name_list(ids.tolist())
+        data = [[names[i], internal[i], total[i] - internal[i], total[i]] for i in range(len(names))]
+        return header, data
 
 class DocumentHandler(xml.sax.handler.ContentHandler):
     TITLE_TAGS = ["sub", "sup", "i", "tt", "ref"]
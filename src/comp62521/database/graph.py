@@ -0,0 +1,305 @@
+import threading
+
+import numpy as np
+
+# pairs of BFS parent arrays kept for reuse by each CoauthorGraph
+PARENT_POOL = 4
+
+
+def expand_pair_entries(starts, counts):
+    # positions of both members of every ordered pair within each author list
+    # authors[starts[i]:starts[i] + counts[i]], self pairs included
+    squares = counts * counts
+    rep_counts = np.repeat(counts, squares)
+    rep_starts = np.repeat(starts, squares)
+    local = np.arange(squares.sum()) - np.repeat(np.cumsum(squares) - squares, squares)
+    return rep_starts + local // rep_counts, rep_starts + local % rep_counts
+
+
+def expand_pairs(starts, counts, authors):
+    # every ordered (author, co-author) pair within each author list
+    # authors[starts[i]:starts[i] + counts[i]], excluding self pairs
+    first, second = expand_pair_entries(starts, counts)
+    src = authors[first]
+    dst = authors[second]
+    keep = src != dst
+    return src[keep], dst[keep]
+
+
+def locate(keys, new):
+    # positions of the sorted, distinct codes new within the sorted codes
+    # keys, and which of them are already there
+    pos = np.searchsorted(keys, new)
+    found = pos < len(keys)
+    found[found] = keys[pos[found]] == new[found]
+    return pos, found
+
+
+# Immutable weighted co-authorship graph in CSR form: the co-authors of author a
+# are neighbours[offsets[a]:offsets[a + 1]] and weights holds the number of
+# joint papers for each of those edges.
+class CoauthorGraph:
+    def __init__(self, offsets, neighbours, weights, paper_counts):
+        self.offsets = offsets
+        self.neighbours = neighbours
+        self.weights = weights
+        self.paper_counts = paper_counts
+        for a in (self.offsets, self.neighbours, self.weights, self.paper_counts):
+            a.flags.writeable = False
+        # BFS parent arrays, all -1 between searches, reused by the searches
+        # of any thread
+        self._pool = []
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def from_publications(cls, store, num_authors):
+        na = max(num_authors, 1)
+        npubs = len(store)
+        # an author listed twice on one paper still counts once
+        entries = np.unique(store.authorship_publications() * na + store.author_ids.values)
+        pubs = entries // na
+        authors = entries % na
+        counts = np.bincount(pubs, minlength=npubs)
+        starts = np.cumsum(counts) - counts
+
+        src, dst = expand_pairs(starts, counts, authors)
+        edges, weights = np.unique(src * na + dst, return_counts=True)
+        degree = np.bincount(edges // na, minlength=num_authors)
+
+        return cls(np.concatenate(([0], np.cumsum(degree))),
+                   (edges % na).astype(np.int32),
+                   weights.astype(np.int32),
+                   np.bincount(authors, minlength=num_authors))
+
+    def merge(self, delta, num_authors):
+        # graph of this graph's papers plus those of delta, a graph built from
+        # publications appended since, over num_authors authors
+        na = max(num_authors, 1)
+        keys = np.repeat(np.arange(len(self), dtype=np.int64), self.degree) * na + self.neighbours
+        new = np.repeat(np.arange(len(delta), dtype=np.int64), delta.degree) * na + delta.neighbours
+        pos, found = locate(keys, new)
+        weights = self.weights.copy()
+        weights[pos[found]] += delta.weights[found]
+        at = pos[~found]
+        edges = np.insert(keys, at, new[~found])
+        weights = np.insert(weights, at, delta.weights[~found])
+        degree = np.bincount(edges // na, minlength=num_authors)
+        paper_counts = delta.paper_counts.copy()
+        paper_counts[:len(self)] += self.paper_counts
+
+        return CoauthorGraph(np.concatenate(([0], np.cumsum(degree))),
+                             (edges % na).astype(np.int32), weights, paper_counts)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def degree(self):
+        return np.diff(self.offsets)
+
+    def neighbours_of(self, author_id):
+        return self.neighbours[self.offsets[author_id]:self.offsets[author_id + 1]]
+
+    def weights_of(self, author_id):
+        return self.weights[self.offsets[author_id]:self.offsets[author_id + 1]]
+
+    def _expand(self, frontier):
+        # neighbours of every frontier node, paired with the node they were reached from
+        starts = self.offsets[frontier]
+        counts = self.offsets[frontier + 1] - starts
+        idx = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        return self.neighbours[idx], np.repeat(frontier, counts)
+
+    def shortest_path(self, source, target):
+        # Bidirectional breadth-first search. Each round expands one whole level
+        # of the cheaper side and stops at the first level where the two
+        # searches meet. Returns the author ids from source to target, or None.
+        if source == target:
+            return [source]
+
+        parents = self._take_parents()
+        frontiers = [np.array([source], dtype=np.int64), np.array([target], dtype=np.int64)]
+        visited = [[frontiers[0]], [frontiers[1]]]
+        parents[0][source] = source
+        parents[1][target] = target
+        try:
+            while len(frontiers[0]) and len(frontiers[1]):
+                cost = [(self.offsets[f + 1] - self.offsets[f]).sum() for f in frontiers]
+                side = 0 if cost[0] <= cost[1] else 1
+                reached, via = self._expand(frontiers[side])
+                new = parents[side][reached] == -1
+                reached, first = np.unique(reached[new], return_index=True)
+                parents[side][reached] = via[new][first]
+                visited[side].append(reached)
+
+                meet = reached[parents[1 - side][reached] != -1]
+                if len(meet):
+                    return self._join(parents, int(meet[0]))
+                frontiers[side] = reached
+            return None
+        finally:
+            # reset only the entries this search wrote
+            for p, nodes in zip(parents, visited):
+                p[np.concatenate(nodes)] = -1
+            with self._pool_lock:
+                if len(self._pool) < PARENT_POOL:
+                    self._pool.append(parents)
+
+    def _take_parents(self):
+        # a pair of parent arrays from the pool, or new ones when every pair
+        # is in use, so a search usually costs only what it visits
+        with self._pool_lock:
+            if self._pool:
+                return self._pool.pop()
+        n = len(self)
+        return np.full(n, -1, dtype=np.int64), np.full(n, -1, dtype=np.int64)
+
+    @staticmethod
+    def _join(parents, middle):
+        path = [middle]
+        while path[-1] != parents[0][path[-1]]:
+            path.append(int(parents[0][path[-1]]))
+        path.reverse()
+        while path[-1] != parents[1][path[-1]]:
+            path.append(int(parents[1][path[-1]]))
+        return path
+
+
+# Co-author edges bucketed by (year, publication type). Bucket b = (year -
+# min_year) * 4 + pub_type holds the distinct ordered pairs src[i] -> dst[i]
+# for i in offsets[b]:offsets[b + 1]; order[i] is the authorship entry of the
+# earliest paper the pair comes from, so results can be listed in reading
+# order. Every distinct edge over all years also keeps the first and last
+# year of collaboration.
+class TemporalCoauthorIndex:
+    def __init__(self, min_year, offsets, src, dst, order, edge_src, edge_dst, edge_order, first_year, last_year):
+        self.min_year = min_year
+        self.offsets = offsets
+        self.src = src
+        self.dst = dst
+        self.order = order
+        self.edge_src = edge_src
+        self.edge_dst = edge_dst
+        self.edge_order = edge_order
+        self.first_year = first_year
+        self.last_year = last_year
+
+    @classmethod
+    def from_publications(cls, store, num_authors):
+        na = max(num_authors, 1)
+        offsets = store.author_offsets.values
+        counts = np.diff(offsets)
+        first, second = expand_pair_entries(offsets[:-1], counts)
+        pubs = np.repeat(np.arange(len(store), dtype=np.int64), counts * counts)
+        src = store.author_ids.values[first].astype(np.int64)
+        dst = store.author_ids.values[second].astype(np.int64)
+        keep = src != dst
+        first, pubs, src, dst = first[keep], pubs[keep], src[keep], dst[keep]
+
+        years = store.year.values
+        min_year = int(years.min()) if len(years) else 0
+        nb = (int(years.max()) - min_year + 1) * 4 if len(years) else 0
+        bucket = (years[pubs].astype(np.int64) - min_year) * 4 + store.pub_type.values[pubs]
+
+        # one entry per (bucket, src, dst), keeping the earliest paper
+        code = (bucket * na + src) * na + dst
+        sort = np.lexsort((first, code))
+        code = code[sort]
+        unique = np.concatenate(([True], code[1:] != code[:-1])) if len(code) else np.zeros(0, dtype=bool)
+        code, order = code[unique], first[sort][unique]
+        bucket, pair = code // (na * na), code % (na * na)
+
+        # one entry per distinct edge over all buckets
+        edges, inverse = np.unique(pair, return_inverse=True)
+        edge_order = np.full(len(edges), np.iinfo(np.int64).max)
+        np.minimum.at(edge_order, inverse, order)
+        year = bucket // 4 + min_year
+        first_year = np.full(len(edges), np.iinfo(np.int32).max, dtype=np.int32)
+        last_year = np.full(len(edges), np.iinfo(np.int32).min, dtype=np.int32)
+        np.minimum.at(first_year, inverse, year)
+        np.maximum.at(last_year, inverse, year)
+
+        return cls(min_year, np.searchsorted(bucket, np.arange(nb + 1)),
+                   (pair // na).astype(np.int32), (pair % na).astype(np.int32), order,
+                   (edges // na).astype(np.int32), (edges % na).astype(np.int32), edge_order,
+                   first_year, last_year)
+
+    def merge(self, delta, base, num_authors):
+        # index of this index's papers plus those of delta, an index built from
+        # publications appended since; base is the number of authorship
+        # entries before them and num_authors the new number of authors
+        na = max(num_authors, 1)
+        spans = [(i.min_year, i.max_year) for i in (self, delta) if len(i.offsets) > 1]
+        if not spans:
+            return delta
+        min_year = min(lo for lo, _ in spans)
+        nb = (max(hi for _, hi in spans) - min_year + 1) * 4
+
+        def codes(index):
+            bucket = np.repeat(np.arange(len(index.offsets) - 1, dtype=np.int64), np.diff(index.offsets))
+            bucket += (index.min_year - min_year) * 4
+            return (bucket * na + index.src) * na + index.dst
+
+        # an entry already present keeps its earlier paper
+        keys, new = codes(self), codes(delta)
+        pos, found = locate(keys, new)
+        at = pos[~found]
+        code = np.insert(keys, at, new[~found])
+        order = np.insert(self.order, at, delta.order[~found] + base)
+        bucket, pair = code // (na * na), code % (na * na)
+
+        keys = self.edge_src.astype(np.int64) * na + self.edge_dst
+        new = delta.edge_src.astype(np.int64) * na + delta.edge_dst
+        pos, found = locate(keys, new)
+        first_year = self.first_year.copy()
+        last_year = self.last_year.copy()
+        first_year[pos[found]] = np.minimum(first_year[pos[found]], delta.first_year[found])
+        last_year[pos[found]] = np.maximum(last_year[pos[found]], delta.last_year[found])
+        at = pos[~found]
+        edges = np.insert(keys, at, new[~found])
+
+        return TemporalCoauthorIndex(min_year, np.searchsorted(bucket, np.arange(nb + 1)),
+                                     (pair // na).astype(np.int32), (pair % na).astype(np.int32), order,
+                                     (edges // na).astype(np.int32), (edges % na).astype(np.int32),
+                                     np.insert(self.edge_order, at, delta.edge_order[~found] + base),
+                                     np.insert(first_year, at, delta.first_year[~found]),
+                                     np.insert(last_year, at, delta.last_year[~found]))
+
+    def collaboration_years(self, a, b):
+        # first and last year in which a and b wrote a paper together, or None
+        lo = np.searchsorted(self.edge_src, a)
+        hi = np.searchsorted(self.edge_src, a, side="right")
+        i = lo + np.searchsorted(self.edge_dst[lo:hi], b)
+        if i < hi and self.edge_dst[i] == b:
+            return int(self.first_year[i]), int(self.last_year[i])
+        return None
+
+    @property
+    def max_year(self):
+        return self.min_year + (len(self.offsets) - 1) // 4 - 1
+
+    def spans_all(self, start_year, end_year, pub_type=None):
+        # whether query() returns every edge
+        return (pub_type is None and (start_year is None or start_year <= self.min_year)
+                and (end_year is None or end_year >= self.max_year))
+
+    def query(self, start_year, end_year, pub_type=None):
+        # (src, dst, order) of the edges from papers in start_year..end_year,
+        # optionally of a single type. An edge found in several buckets is
+        # returned once per bucket.
+        lo_year = self.min_year if start_year is None else max(start_year, self.min_year)
+        hi_year = self.max_year if end_year is None else min(end_year, self.max_year)
+        if lo_year > hi_year:
+            return self.src[:0], self.dst[:0], self.order[:0]
+        if self.spans_all(start_year, end_year, pub_type):
+            # the whole dataset: the merged edge list is already stored
+            return self.edge_src, self.edge_dst, self.edge_order
+
+        if pub_type is None:
+            buckets = np.arange((lo_year - self.min_year) * 4, (hi_year - self.min_year + 1) * 4)
+        else:
+            buckets = (np.arange(lo_year, hi_year + 1) - self.min_year) * 4 + pub_type
+        starts = self.offsets[buckets]
+        counts = self.offsets[buckets + 1] - starts
+        idx = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        return self.src[idx], self.dst[idx], self.order[idx]
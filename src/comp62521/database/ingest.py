@@ -0,0 +1,268 @@
+import bz2
+import gzip
+import multiprocessing
+import os
+import re
+import time
+import xml.parsers.expat
+
+from comp62521.database.store import Publication
+
+BLOCK_SIZE = 1 << 20
+
+PUB_TYPE = {
+    "inproceedings": Publication.CONFERENCE_PAPER,
+    "article": Publication.JOURNAL,
+    "book": Publication.BOOK,
+    "incollection": Publication.BOOK_CHAPTER}
+
+TITLE_TAGS = frozenset(["sub", "sup", "i", "tt", "ref"])
+
+# start tag of any top-level DBLP record, used to cut large files into chunks
+RECORD_START = re.compile(rb"<(article|inproceedings|proceedings|book|incollection|"
+                          rb"phdthesis|mastersthesis|www|person|data)[\s>]")
+ROOT_START = re.compile(rb"<dblp[^>]*>")
+CHUNK_BYTES = 64 << 20
+
+
+def open_source(filename):
+    # Returns (raw, stream): raw is the file on disk, whose position is the
+    # number of bytes consumed so far; stream yields the decompressed XML.
+    raw = open(filename, "rb")
+    if filename.endswith(".gz"):
+        return raw, gzip.GzipFile(fileobj=raw, mode="rb")
+    if filename.endswith(".bz2"):
+        return raw, bz2.BZ2File(raw, mode="rb")
+    return raw, raw
+
+
+class IngestStats:
+    def __init__(self, filename, parser, bytes_total=None):
+        self.filename = filename
+        self.parser = parser
+        self.records = 0
+        self.bytes_read = 0
+        if bytes_total is None:
+            bytes_total = os.path.getsize(filename)
+        self.bytes_total = bytes_total
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def finish(self, records):
+        self.records = records
+        self.bytes_read = self.bytes_total
+        self.seconds = time.perf_counter() - self.started
+
+    @property
+    def records_per_second(self):
+        if self.seconds > 0:
+            return self.records / self.seconds
+        return 0.0
+
+    def __str__(self):
+        return (f"Read {self.records} publications from {self.filename} with {self.parser} "
+                f"in {self.seconds:.2f}s ({self.records_per_second:.0f} publications/s)")
+
+
+# Text file that records in stats how many bytes the parser has consumed
+class ProgressFile:
+    def __init__(self, f, stats):
+        self.f = f
+        self.name = f.name
+        self.stats = stats
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.stats.bytes_read = self.f.buffer.tell()
+        return data
+
+    def close(self):
+        self.f.close()
+
+
+# Streaming DBLP reader on top of expat. It feeds the parser fixed-size blocks
+# (decompressing .gz and .bz2 on the fly), collects text as a list of chunks
+# and resolves each tag through a single dictionary lookup. It hands records
+# to db.add_publication exactly as DocumentHandler does.
+class StreamingReader:
+    def __init__(self, db):
+        self.db = db
+        self.pub_type = None
+        self.key = None
+        self.tag = None
+        self.chunks = []
+        self.authors = []
+        self.title = None
+        self.year = None
+
+    def read(self, filename, stats=None):
+        raw, stream = open_source(filename)
+        try:
+            return self.parse(self._blocks(raw, stream, stats))
+        except (OSError, EOFError) as e:
+            print("Error reading file (" + str(e) + ")")
+            return False
+        finally:
+            stream.close()
+            raw.close()
+
+    def read_range(self, filename, prolog, start, end, stats=None):
+        # parse the records in bytes [start, end) of an uncompressed file,
+        # wrapped in the file's own prolog and a closing root tag
+        with open(filename, "rb") as raw:
+            raw.seek(start)
+
+            def blocks():
+                yield prolog
+                remaining = end - start
+                while remaining > 0:
+                    block = raw.read(min(BLOCK_SIZE, remaining))
+                    if not block:
+                        break
+                    remaining -= len(block)
+                    if stats is not None:
+                        stats.bytes_read = raw.tell() - start
+                    yield block
+                yield b"</dblp>"
+
+            return self.parse(blocks())
+
+    @staticmethod
+    def _blocks(raw, stream, stats):
+        while True:
+            block = stream.read(BLOCK_SIZE)
+            if not block:
+                return
+            if stats is not None:
+                stats.bytes_read = raw.tell()
+            yield block
+
+    def parse(self, blocks):
+        parser = xml.parsers.expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = self.start
+        parser.EndElementHandler = self.end
+        parser.CharacterDataHandler = self.characters
+        try:
+            for block in blocks:
+                parser.Parse(block, False)
+            parser.Parse(b"", True)
+        except xml.parsers.expat.ExpatError as e:
+            print("Error reading file (" + xml.parsers.expat.ErrorString(e.code) + ")")
+            return False
+        return True
+
+    def start(self, name, attrs):
+        if name in TITLE_TAGS:
+            return
+        pub_type = PUB_TYPE.get(name)
+        if pub_type is not None:
+            self.pub_type = pub_type
+            self.key = attrs.get("key", "/void")
+        self.tag = name
+        self.chunks = []
+
+    def end(self, name):
+        if self.pub_type is None or name in TITLE_TAGS:
+            return
+        tag = self.tag
+        if tag == "author":
+            self.authors.append("".join(self.chunks).strip())
+        elif tag == "title":
+            self.title = "".join(self.chunks).strip()
+        elif tag == "year":
+            self.year = int("".join(self.chunks))
+        elif name in PUB_TYPE:
+            self.db.add_publication(self.pub_type, self.title, self.year, self.authors, self.key)
+            self.pub_type = None
+            self.authors = []
+            self.title = None
+            self.year = None
+        self.tag = None
+        self.chunks = []
+
+    def characters(self, data):
+        if self.pub_type is not None:
+            self.chunks.append(data)
+
+
+def split_file(filename, chunk_bytes):
+    # Cut an uncompressed file into byte ranges that each start at a record
+    # boundary. Returns [(filename, None)] when the file is parsed whole,
+    # otherwise [(filename, (prolog, start, end)), ...] in file order.
+    size = os.path.getsize(filename)
+    if size <= chunk_bytes or filename.endswith((".gz", ".bz2")):
+        return [(filename, None)]
+
+    with open(filename, "rb") as f:
+        head = f.read(1 << 16)
+        root = ROOT_START.search(head)
+        f.seek(max(0, size - 4096))
+        tail = f.read()
+        close = tail.rfind(b"</dblp>")
+        if root is None or close < 0:
+            return [(filename, None)]
+        end = size - len(tail) + close
+
+        bounds = [root.end()]
+        pos = root.end() + chunk_bytes
+        while pos < end:
+            f.seek(pos)
+            window = f.read(1 << 16)
+            match = RECORD_START.search(window)
+            while match is None and window and pos + len(window) < end:
+                more = f.read(1 << 16)
+                window += more
+                match = RECORD_START.search(window)
+                if not more:
+                    break
+            if match is None or pos + match.start() >= end:
+                break
+            bounds.append(pos + match.start())
+            pos = bounds[-1] + chunk_bytes
+        bounds.append(end)
+
+    prolog = head[:root.end()]
+    return [(filename, (prolog, bounds[i], bounds[i + 1])) for i in range(len(bounds) - 1)]
+
+
+def parse_task(task):
+    # Worker side of a parallel read: parse one file or chunk into a private
+    # Database and return its columns with file-local author ids.
+    from comp62521.database.database import Database
+
+    filename, chunk = task
+    db = Database()
+    reader = StreamingReader(db)
+    if chunk is None:
+        stats = IngestStats(filename, "parallel")
+        ok = reader.read(filename, stats)
+    else:
+        prolog, start, end = chunk
+        stats = IngestStats(f"{filename}[{start}:{end}]", "parallel", end - start)
+        ok = reader.read_range(filename, prolog, start, end, stats)
+    store = db.publications
+    stats.finish(len(store))
+    return {
+        "ok": ok,
+        "stats": stats,
+        "names": db.authors.name_list(),
+        "pub_type": store.pub_type.values.copy(),
+        "year": store.year.values.copy(),
+        "author_offsets": store.author_offsets.values.copy(),
+        "author_ids": store.author_ids.values.copy(),
+        "titles": store.titles,
+        "keys": store.keys,
+    }
+
+
+def read_parallel(filenames, processes=None, chunk_bytes=None):
+    # Parse files (or chunks of large files) in a process pool. Results come
+    # back in input order, so merging them one after another assigns author
+    # ids exactly as a sequential read would.
+    if chunk_bytes is None:
+        chunk_bytes = CHUNK_BYTES
+    tasks = [task for f in filenames for task in split_file(f, chunk_bytes)]
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap(parse_task, tasks):
+            yield result
@@ -1,7 +1,14 @@
+from comp62521.database.table import SortedTable
+
+
 class MockDatabase:
     def read(self, filename):
         pass
 
+    # Same as Database.get_table, without the caching
+    def get_table(self, name, *args):
+        return SortedTable(*getattr(self, name)(*args))
+
     def get_publication_summary(self):
         return (('Details', 'Conference Paper', 'Journal', 'Book', 'Book Chapter', 'Total'),
                 [('Number of publications', 10, 5, 8, 2, 25), ('Number of authors', 10, 5, 8, 2, 25)])
@@ -0,0 +1,281 @@
+import bisect
+import numpy as np
+
+# Rank tiers of a name search result, best first
+EXACT = 0
+LAST_NAME = 1
+LAST_NAME_PREFIX = 2
+FIRST_NAME = 3
+FIRST_NAME_PREFIX = 4
+MIDDLE_NAME = 5
+SUBSTRING = 6
+
+_MAX_CHAR = chr(0x10FFFF)
+
+
+# Author name index built once over the author table. Lower-cased name tokens
+# form a sorted vocabulary; each token has a posting list of the authors using
+# it, and the surname and forename of every author are kept sorted by token so
+# that a prefix becomes a contiguous range. A suffix array over the vocabulary
+# answers substring queries. Search cost depends on the number of matches,
+# not on the number of authors.
+class NameIndex:
+    ARRAYS = ("postings", "tiers", "offsets", "surnames", "surname_authors",
+              "forenames", "forename_authors", "suffix_pos", "suffix_token")
+
+    def __init__(self, names, author_idx):
+        self.names = names
+        self.author_idx = author_idx
+
+        provisional = {}
+        entry_token, entry_author, entry_tier = [], [], []
+        surname, forename = [], []
+        for a, name in enumerate(names):
+            parts = [provisional.setdefault(t, len(provisional)) for t in name.lower().split()]
+            if not parts:
+                surname.append(-1)
+                forename.append(-1)
+                continue
+            seen = set()
+            for j, t in enumerate(parts):
+                # only the first occurrence of a token decides its tier
+                if t in seen:
+                    continue
+                seen.add(t)
+                entry_token.append(t)
+                entry_author.append(a)
+                if j == len(parts) - 1:
+                    entry_tier.append(LAST_NAME)
+                elif j == 0:
+                    entry_tier.append(FIRST_NAME)
+                else:
+                    entry_tier.append(MIDDLE_NAME)
+            surname.append(parts[-1])
+            forename.append(parts[0])
+
+        self.vocab = sorted(provisional)
+        rank = np.empty(len(provisional) + 1, dtype=np.int64)
+        rank[[provisional[t] for t in self.vocab]] = np.arange(len(self.vocab))
+        rank[-1] = -1
+
+        entry_token = rank[np.array(entry_token, dtype=np.int64)]
+        order = np.lexsort((entry_author, entry_token))
+        self.postings = np.array(entry_author, dtype=np.int32)[order]
+        self.tiers = np.array(entry_tier, dtype=np.int8)[order]
+        self.offsets = np.searchsorted(entry_token[order], np.arange(len(self.vocab) + 1))
+
+        self.surnames, self.surname_authors = self._sorted_by_token(rank[np.array(surname, dtype=np.int64)])
+        self.forenames, self.forename_authors = self._sorted_by_token(rank[np.array(forename, dtype=np.int64)])
+
+        self._build_suffix_array()
+
+    def extend(self, start):
+        # Index of the names after authors start: onwards have been added to
+        # the table, built from this one by merging in the new names' tokens,
+        # postings and suffixes. The result equals a full rebuild.
+        new_tokens, entry_author, entry_tier = [], [], []
+        surname, forename = [], []
+        for a in range(start, len(self.names)):
+            parts = self.names[a].lower().split()
+            if not parts:
+                surname.append(None)
+                forename.append(None)
+                continue
+            seen = set()
+            for j, t in enumerate(parts):
+                if t in seen:
+                    continue
+                seen.add(t)
+                new_tokens.append(t)
+                entry_author.append(a)
+                if j == len(parts) - 1:
+                    entry_tier.append(LAST_NAME)
+                elif j == 0:
+                    entry_tier.append(FIRST_NAME)
+                else:
+                    entry_tier.append(MIDDLE_NAME)
+            surname.append(parts[-1])
+            forename.append(parts[0])
+
+        # tokens not yet in the vocabulary, and where they go
+        added = sorted(t for t in set(new_tokens) if not self._has_token(t))
+        at = [bisect.bisect_left(self.vocab, t) for t in added]
+        vocab, prev = [], 0
+        for i, t in zip(at, added):
+            vocab.extend(self.vocab[prev:i])
+            vocab.append(t)
+            prev = i
+        vocab.extend(self.vocab[prev:])
+        remap = np.arange(len(self.vocab)) + np.searchsorted(np.array(at, dtype=np.int64),
+                                                              np.arange(len(self.vocab)), side="right")
+
+        def rank(tokens):
+            return np.array([-1 if t is None else bisect.bisect_left(vocab, t) for t in tokens], dtype=np.int64)
+
+        def renumber(tokens):
+            tokens = tokens.copy()
+            valid = tokens >= 0
+            tokens[valid] = remap[tokens[valid]]
+            return tokens
+
+        index = NameIndex.__new__(NameIndex)
+        index.names = self.names
+        index.author_idx = self.author_idx
+        index.vocab = vocab
+
+        # new authors have the largest ids, so they go after the existing
+        # authors of the same token
+        old = np.repeat(remap, np.diff(self.offsets))
+        entry_token = rank(new_tokens)
+        order = np.lexsort((entry_author, entry_token))
+        entry_token = entry_token[order]
+        pos = np.searchsorted(old, entry_token, side="right")
+        index.postings = np.insert(self.postings, pos, np.array(entry_author, dtype=np.int32)[order])
+        index.tiers = np.insert(self.tiers, pos, np.array(entry_tier, dtype=np.int8)[order])
+        index.offsets = np.searchsorted(np.insert(old, pos, entry_token), np.arange(len(vocab) + 1))
+
+        def merge_sorted(tokens, authors, new):
+            old = renumber(tokens)
+            new, new_authors = self._sorted_by_token(rank(new))
+            pos = np.searchsorted(old, new, side="right")
+            return np.insert(old, pos, new), np.insert(authors, pos, new_authors + np.int32(start))
+
+        index.surnames, index.surname_authors = merge_sorted(self.surnames, self.surname_authors, surname)
+        index.forenames, index.forename_authors = merge_sorted(self.forenames, self.forename_authors, forename)
+
+        # existing suffixes move with their token; those of the added tokens
+        # are placed by binary search over the existing ones
+        index.text = "\0".join(vocab) + "\0"
+        old_starts = np.cumsum([0] + [len(t) + 1 for t in self.vocab])[:-1]
+        starts = np.cumsum([0] + [len(t) + 1 for t in vocab])[:-1]
+        tokens = self.suffix_token
+        suffix_pos = starts[remap[tokens]] + (self.suffix_pos - old_starts[tokens])
+        suffixes = []
+        for t in added:
+            k = bisect.bisect_left(vocab, t)
+            suffixes.extend((t[i:], int(starts[k]) + i, k) for i in range(len(t)))
+        suffixes.sort()
+        pos = []
+        for suffix, p, _ in suffixes:
+            lo, hi = 0, len(suffix_pos)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                q = int(suffix_pos[mid])
+                if (index.text[q:index.text.index("\0", q)], q) < (suffix, p):
+                    lo = mid + 1
+                else:
+                    hi = mid
+            pos.append(lo)
+        index.suffix_pos = np.insert(suffix_pos, pos, np.array([s[1] for s in suffixes], dtype=np.int64))
+        index.suffix_token = np.insert(remap[tokens], pos, np.array([s[2] for s in suffixes], dtype=np.int64))
+        return index
+
+    def _has_token(self, t):
+        i = bisect.bisect_left(self.vocab, t)
+        return i < len(self.vocab) and self.vocab[i] == t
+
+    @classmethod
+    def restore(cls, names, author_idx, vocab, arrays):
+        index = cls.__new__(cls)
+        index.names = names
+        index.author_idx = author_idx
+        index.vocab = vocab
+        index.text = "\0".join(vocab) + "\0"
+        for name in cls.ARRAYS:
+            setattr(index, name, arrays[name])
+        return index
+
+    @staticmethod
+    def _sorted_by_token(tokens):
+        order = np.argsort(tokens, kind="stable")
+        return tokens[order], order.astype(np.int32)
+
+    def _build_suffix_array(self):
+        # every suffix of every vocabulary token, sorted, as positions into
+        # the NUL-separated vocabulary text
+        self.text = "\0".join(self.vocab) + "\0"
+        starts = np.cumsum([0] + [len(t) + 1 for t in self.vocab])[:-1]
+        suffixes = [(t[i:], s + i, k) for k, (t, s) in enumerate(zip(self.vocab, starts.tolist()))
+                    for i in range(len(t))]
+        suffixes.sort()
+        self.suffix_pos = np.array([s[1] for s in suffixes], dtype=np.int64)
+        self.suffix_token = np.array([s[2] for s in suffixes], dtype=np.int64)
+
+    def _token_range(self, q):
+        # ids of the vocabulary tokens starting with q
+        return bisect.bisect_left(self.vocab, q), bisect.bisect_left(self.vocab, q + _MAX_CHAR)
+
+    def _authors_by_token(self, tokens, authors, lo, hi):
+        a, b = np.searchsorted(tokens, [lo, hi])
+        return authors[a:b]
+
+    def _tokens_containing(self, q):
+        m = len(q)
+        lo, hi = 0, len(self.suffix_pos)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            p = self.suffix_pos[mid]
+            if self.text[p:p + m] < q:
+                lo = mid + 1
+            else:
+                hi = mid
+        first = lo
+        hi = len(self.suffix_pos)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            p = self.suffix_pos[mid]
+            if self.text[p:p + m] <= q:
+                lo = mid + 1
+            else:
+                hi = mid
+        return np.unique(self.suffix_token[first:lo])
+
+    def _postings_of(self, tokens):
+        starts = self.offsets[tokens]
+        counts = self.offsets[tokens + 1] - starts
+        idx = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        return self.postings[idx]
+
+    def match(self, query):
+        # author id -> rank tier of every author matching the query
+        found = {}
+        if query is None or len(query) == 0:
+            return found
+
+        if query in self.author_idx:
+            found[self.author_idx[query]] = EXACT
+
+        q = query.lower()
+        lo, hi = self._token_range(q)
+        if lo < len(self.vocab) and self.vocab[lo] == q:
+            a, b = self.offsets[lo], self.offsets[lo + 1]
+            for author, tier in zip(self.postings[a:b].tolist(), self.tiers[a:b].tolist()):
+                found.setdefault(author, tier)
+
+        for author in self._authors_by_token(self.surnames, self.surname_authors, lo, hi).tolist():
+            found.setdefault(author, LAST_NAME_PREFIX)
+        for author in self._authors_by_token(self.forenames, self.forename_authors, lo, hi).tolist():
+            found.setdefault(author, FIRST_NAME_PREFIX)
+
+        pieces = q.split()
+        if pieces:
+            candidates = np.unique(self._postings_of(self._tokens_containing(max(pieces, key=len))))
+            verify = len(pieces) > 1 or pieces[0] != q
+        else:
+            candidates = range(len(self.names))
+            verify = True
+        for author in np.asarray(candidates).tolist():
+            if author not in found and (not verify or q in self.names[author].lower()):
+                found[author] = SUBSTRING
+
+        return found
+
+    def search(self, query):
+        # matching names ordered by tier, then surname and forename
+        found = self.match(query)
+
+        def key(author):
+            parts = self.names[author].split() or [""]
+            return found[author], parts[-1], parts[0], author
+
+        return [self.names[a] for a in sorted(found, key=key)]
@@ -0,0 +1,114 @@
+import json
+import os
+import numpy as np
+
+from comp62521.database.authors import AuthorTable
+from comp62521.database.graph import CoauthorGraph
+from comp62521.database.search import NameIndex
+from comp62521.database.store import Column, PublicationStore
+
+# A snapshot is a directory of .npy files, one per array, plus manifest.json.
+# The manifest records the size and mtime of every source file so a snapshot
+# is only reused while the XML it was built from is unchanged. It is written
+# last, so a partially written snapshot is never loaded.
+FORMAT = 2
+MANIFEST = "manifest.json"
+GRAPH_ARRAYS = ("offsets", "neighbours", "weights", "paper_counts")
+
+
+def fingerprint(filenames):
+    if isinstance(filenames, str):
+        filenames = [filenames]
+    sources = []
+    for f in filenames:
+        st = os.stat(f)
+        sources.append({"path": os.path.abspath(f), "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+    return sources
+
+
+def _pack_strings(strings):
+    # NUL-separated UTF-8 arena; None is recorded in a separate mask
+    missing = np.array([s is None for s in strings], dtype=bool)
+    arena = "\0".join("" if s is None else s for s in strings).encode("utf-8")
+    return np.frombuffer(arena, dtype=np.uint8), missing
+
+
+def _unpack_strings(arena, count, missing=None):
+    if count == 0:
+        return []
+    strings = arena.tobytes().decode("utf-8").split("\0")
+    if missing is not None and missing.any():
+        for i in np.flatnonzero(missing).tolist():
+            strings[i] = None
+    return strings
+
+
+def save(db, directory, filenames):
+    os.makedirs(directory, exist_ok=True)
+    manifest = os.path.join(directory, MANIFEST)
+    if os.path.exists(manifest):
+        os.remove(manifest)
+
+    arrays = {}
+    store = db.publications
+    for name in PublicationStore.COLUMNS:
+        arrays["store." + name] = getattr(store, name).values
+    arrays["store.titles"], arrays["store.titles_missing"] = _pack_strings(store.titles)
+    arrays["store.keys"], arrays["store.keys_missing"] = _pack_strings(store.keys)
+    arrays["authors.arena"] = db.authors.arena.values
+    arrays["authors.offsets"] = db.authors.offsets.values
+
+    graph = db.coauthor_graph
+    for name in GRAPH_ARRAYS:
+        arrays["graph." + name] = getattr(graph, name)
+
+    index = db.name_index
+    for name in NameIndex.ARRAYS:
+        arrays["names." + name] = getattr(index, name)
+    arrays["names.vocab"], _ = _pack_strings(index.vocab)
+
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, name + ".npy"), np.ascontiguousarray(array))
+
+    info = {
+        "format": FORMAT,
+        "sources": fingerprint(filenames),
+        "publications": len(store),
+        "authors": len(db.authors),
+        "vocab": len(index.vocab),
+        "min_year": db.min_year,
+        "max_year": db.max_year,
+    }
+    with open(manifest + ".tmp", "w") as f:
+        json.dump(info, f)
+    os.replace(manifest + ".tmp", manifest)
+
+
+def load(db, directory, filenames):
+    # Restore db from the snapshot in directory. Returns False, leaving db
+    # untouched, when there is no usable snapshot for filenames.
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            info = json.load(f)
+        if info["format"] != FORMAT or info["sources"] != fingerprint(filenames):
+            return False
+    except (OSError, ValueError, KeyError):
+        return False
+
+    def array(name):
+        return np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+
+    store = PublicationStore()
+    for name in PublicationStore.COLUMNS:
+        setattr(store, name, Column.wrap(array("store." + name)))
+    store.titles = _unpack_strings(array("store.titles"), info["publications"], array("store.titles_missing"))
+    store.keys = _unpack_strings(array("store.keys"), info["publications"], array("store.keys_missing"))
+
+    authors = AuthorTable.wrap(array("authors.arena"), array("authors.offsets"))
+
+    graph = CoauthorGraph(*[array("graph." + name) for name in GRAPH_ARRAYS])
+    index = NameIndex.restore(authors.names, authors.ids, _unpack_strings(array("names.vocab"), info["vocab"]),
+                              {name: array("names." + name) for name in NameIndex.ARRAYS})
+
+    db.restore(store, authors, info["min_year"], info["max_year"], graph, index)
+    return True
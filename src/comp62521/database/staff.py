@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+
+STAFF_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "static", "CS-staff.txt")
+
+
+# Names of the School's staff, one per line in a text file. The file is read
+# again only when its size or modification time changes; a missing file is an
+# empty roster.
+class StaffRoster:
+    def __init__(self, filename=STAFF_FILE):
+        self.filename = filename
+        self.names = frozenset()
+        self.version = 0
+        self._stamp = None
+
+    def refresh(self):
+        # reload the file if it changed since the last call; True if it did
+        try:
+            st = os.stat(self.filename)
+            stamp = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            stamp = None
+        if stamp == self._stamp:
+            return False
+        names = frozenset()
+        if stamp is None:
+            print(f"Warning: staff roster {self.filename} not found")
+        else:
+            with open(self.filename, encoding="utf-8") as f:
+                names = frozenset(line.strip() for line in f if line.strip())
+        self.names = names
+        self._stamp = stamp
+        self.version += 1
+        return True
+
+    def mask(self, authors):
+        # boolean array over the ids of authors (an AuthorTable), True for staff
+        mask = np.zeros(len(authors), dtype=bool)
+        ids = [authors.find(name) for name in self.names]
+        mask[[a for a in ids if a >= 0]] = True
+        return mask
@@ -0,0 +1,151 @@
+import numpy as np
+
+
+class Publication:
+    CONFERENCE_PAPER = 0
+    JOURNAL = 1
+    BOOK = 2
+    BOOK_CHAPTER = 3
+
+    def __init__(self, pub_type, title, year, authors, key):
+        self.pub_type = pub_type
+        self.title = title
+        if year:
+            self.year = int(year)
+        else:
+            self.year = -1
+        self.authors = authors
+        self.key = key
+
+
+# Growable NumPy array with amortised O(1) append
+class Column:
+    def __init__(self, dtype, values=None, capacity=1024):
+        if values is None:
+            self._data = np.empty(capacity, dtype=dtype)
+            self._size = 0
+        else:
+            self._data = np.array(values, dtype=dtype)
+            self._size = len(self._data)
+
+    @classmethod
+    def wrap(cls, array):
+        # use array as the column contents without copying; the first append
+        # moves the data into a private, growable buffer
+        column = cls(array.dtype, capacity=0)
+        column._data = array
+        column._size = len(array)
+        return column
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    @property
+    def values(self):
+        return self._data[:self._size]
+
+    def append(self, value):
+        if self._size == len(self._data):
+            self._grow(self._size + 1)
+        self._data[self._size] = value
+        self._size += 1
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._data.dtype)
+        end = self._size + len(values)
+        if end > len(self._data):
+            self._grow(end)
+        self._data[self._size:end] = values
+        self._size = end
+
+    def _grow(self, minimum):
+        data = np.empty(max(minimum, 2 * len(self._data)), dtype=self._data.dtype)
+        data[:self._size] = self._data[:self._size]
+        self._data = data
+
+
+# Column-oriented publication table. Authorship is kept in CSR form: the
+# authors of publication i are author_ids[author_offsets[i]:author_offsets[i + 1]].
+class PublicationStore:
+    COLUMNS = ("pub_type", "year", "author_offsets", "author_ids")
+
+    def __init__(self):
+        self.pub_type = Column(np.int8)
+        self.year = Column(np.int32)
+        self.author_offsets = Column(np.int64, [0])
+        self.author_ids = Column(np.int32)
+        self.titles = []
+        self.keys = []
+
+    def __len__(self):
+        return len(self.titles)
+
+    def __getitem__(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("publication index out of range")
+        return Publication(int(self.pub_type.values[i]), self.titles[i],
+                           int(self.year.values[i]), self.authors_of(i), self.keys[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, pub_type, title, year, author_ids, key):
+        self.pub_type.append(pub_type)
+        self.year.append(year)
+        self.author_ids.extend(author_ids)
+        self.author_offsets.append(len(self.author_ids))
+        self.titles.append(title)
+        self.keys.append(key)
+
+    def extend(self, pub_type, year, author_offsets, author_ids, titles, keys):
+        # append a block of publications whose author_offsets start at 0
+        base = len(self.author_ids)
+        self.pub_type.extend(pub_type)
+        self.year.extend(year)
+        self.author_ids.extend(author_ids)
+        self.author_offsets.extend(np.asarray(author_offsets[1:]) + base)
+        self.titles.extend(titles)
+        self.keys.extend(keys)
+
+    def tail(self, start):
+        # publications start: onwards as a store of their own, sharing this
+        # store's arrays; its authorship positions are relative to
+        # author_offsets[start]
+        store = PublicationStore()
+        offsets = self.author_offsets.values
+        store.pub_type = Column.wrap(self.pub_type.values[start:])
+        store.year = Column.wrap(self.year.values[start:])
+        store.author_offsets = Column.wrap(offsets[start:] - offsets[start])
+        store.author_ids = Column.wrap(self.author_ids.values[offsets[start]:])
+        store.titles = self.titles[start:]
+        store.keys = self.keys[start:]
+        return store
+
+    def authors_of(self, i):
+        offsets = self.author_offsets.values
+        return self.author_ids.values[offsets[i]:offsets[i + 1]].tolist()
+
+    def author_counts(self):
+        return np.diff(self.author_offsets.values)
+
+    def authorship_publications(self):
+        # publication index of every entry in author_ids
+        return np.repeat(np.arange(len(self), dtype=np.int64), self.author_counts())
+
+    def keep(self, mask):
+        mask = np.asarray(mask, dtype=bool)
+        counts = self.author_counts()
+        self.author_ids = Column(np.int32, self.author_ids.values[np.repeat(mask, counts)])
+        self.author_offsets = Column(np.int64, np.concatenate(([0], np.cumsum(counts[mask]))))
+        self.pub_type = Column(np.int8, self.pub_type.values[mask])
+        self.year = Column(np.int32, self.year.values[mask])
+        self.titles = [t for t, k in zip(self.titles, mask) if k]
+        self.keys = [t for t, k in zip(self.keys, mask) if k]
@@ -0,0 +1,151 @@
+import numpy as np
+
+# Seeded generator of DBLP-style XML (elements as in data/dblp.dtd) for
+# benchmarks. The same seed and size always give the same file.
+#
+# Shape of the data, roughly following DBLP:
+# * the number of authors per paper peaks at 2-3 and has a long tail;
+# * author productivity is heavy-tailed, so a few authors write many papers;
+# * co-authors are mostly drawn from the first author's community (authors
+#   with nearby ids), the rest from anywhere, which gives a small-world graph;
+# * the number of papers per year grows exponentially.
+
+PUB_TAGS = ["inproceedings", "article", "book", "incollection"]
+PUB_TYPE_P = [0.54, 0.38, 0.03, 0.05]
+
+AUTHOR_COUNTS = np.arange(1, 9)
+AUTHOR_COUNT_P = np.array([0.14, 0.27, 0.24, 0.15, 0.09, 0.05, 0.03, 0.02])
+LONG_TAIL_P = 0.01
+LONG_TAIL_MAX = 30
+
+COMMUNITY_P = 0.75
+COMMUNITY_WIDTH = 40
+
+FIRST_YEAR = 1960
+LAST_YEAR = 2020
+YEAR_GROWTH = 1.07
+
+AUTHORS_PER_PUBLICATION = 0.6
+# prime, hence coprime to the number of possible names
+NAME_MULTIPLIER = 1000003
+BATCH = 50000
+
+FIRST_NAMES = (
+    "Adam Ahmed Aiko Alan Alice Amir Ana Andrea Anna Antonio Ben Bo Carla Carlos Chen Chris Claire Daniel "
+    "David Diana Elena Emma Eric Eva Fatima Felix Fang Gabriel Grace Hans Hao Hiroshi Ian Ines Ivan Jan "
+    "Jia Jorge Jose Julia Karen Kenji Kim Lars Laura Lei Li Lin Lucas Luis Maria Mark Marta Mei Miguel "
+    "Ming Nadia Nina Omar Oscar Paolo Paul Pedro Peter Priya Qing Rafael Ravi Rosa Ruth Sara Sergei Shan "
+    "Sofia Stefan Sun Tariq Tom Uma Victor Wei Xin Yan Yuki Yusuf Zoe").split()
+SYLLABLES = (
+    "an ba be bo ca ce chi da de di do el en fa fe ga gi ha he hu ka ke ki ko la le li lo lu ma me mi mo "
+    "na ne ni no ra re ri ro sa se si so ta te ti to va ve wa ya yo za").split()
+# a few names carry non-ASCII letters, written as character references
+ACCENTS = ["&#252;", "&#233;", "&#246;", "&#231;", "&#225;"]
+WORDS = (
+    "adaptive algebra analysis approach architecture aware caching cloud clustering complex concurrency "
+    "data database design distributed dynamic efficient evaluation fast framework graph index integration "
+    "knowledge language large learning logic management mining model network object optimization parallel "
+    "processing query reasoning scalable schema search semantic spatial storage stream system temporal "
+    "transaction uncertain view web workload").split()
+
+
+def author_name(a, offset):
+    # name of author a: a forename, an optional middle initial and a surname
+    # of two or three syllables. a is spread over all combinations by a
+    # seeded affine map, so authors with nearby ids get unrelated names.
+    ns = len(SYLLABLES)
+    x = (a * NAME_MULTIPLIER + offset) % (len(FIRST_NAMES) * 27 * ns * ns * (ns + 1))
+    first = FIRST_NAMES[x % len(FIRST_NAMES)]
+    x //= len(FIRST_NAMES)
+    middle = x % 27
+    x //= 27
+    s1, s2, s3 = x % ns, (x // ns) % ns, x // ns // ns
+    last = (SYLLABLES[s1] + SYLLABLES[s2] + (SYLLABLES[s3 - 1] if s3 else "")).capitalize()
+    if a % 97 == 0:
+        last = last[:2] + ACCENTS[a % len(ACCENTS)] + last[2:]
+    if middle:
+        return f"{first} {chr(ord('A') + middle - 1)}. {last}"
+    return f"{first} {last}"
+
+
+def _author_lists(rng, n, num_authors, weights):
+    counts = rng.choice(AUTHOR_COUNTS, size=n, p=AUTHOR_COUNT_P / AUTHOR_COUNT_P.sum())
+    tail = rng.random(n) < LONG_TAIL_P
+    counts[tail] = rng.integers(AUTHOR_COUNTS[-1] + 1, LONG_TAIL_MAX + 1, size=tail.sum())
+
+    total = counts.sum()
+    lead = rng.choice(num_authors, size=n, p=weights)
+    lead_of_slot = np.repeat(lead, counts)
+    community = lead_of_slot + np.rint(rng.normal(0, COMMUNITY_WIDTH, size=total)).astype(np.int64)
+    anywhere = rng.choice(num_authors, size=total, p=weights)
+    slots = np.where(rng.random(total) < COMMUNITY_P, community % num_authors, anywhere)
+    starts = np.cumsum(counts) - counts
+    slots[starts] = lead
+    return counts, slots
+
+
+def generate(out, publications, seed=0, authors=None):
+    # Write publications records to out (a path or a text file object)
+    if authors is None:
+        authors = max(10, int(publications * AUTHORS_PER_PUBLICATION))
+    rng = np.random.default_rng(seed)
+    name_offset = int(rng.integers(1 << 30))
+    weights = rng.pareto(1.5, size=authors) + 1.0
+    weights /= weights.sum()
+    years = np.arange(FIRST_YEAR, LAST_YEAR + 1)
+    year_p = YEAR_GROWTH ** (years - FIRST_YEAR)
+    year_p /= year_p.sum()
+
+    if isinstance(out, str):
+        with open(out, "w", encoding="utf-8") as f:
+            return generate(f, publications, seed, authors)
+
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n<dblp>\n')
+    cache = {}
+    number = 0
+    for lo in range(0, publications, BATCH):
+        n = min(BATCH, publications - lo)
+        types = rng.choice(len(PUB_TAGS), size=n, p=PUB_TYPE_P).tolist()
+        pub_years = rng.choice(years, size=n, p=year_p).tolist()
+        venues = rng.integers(0, 500, size=n).tolist()
+        pages = rng.integers(1, 1000, size=n).tolist()
+        words = rng.integers(0, len(WORDS), size=(n, 5)).tolist()
+        counts, slots = _author_lists(rng, n, authors, weights)
+        offsets = np.concatenate(([0], np.cumsum(counts))).tolist()
+        slots = slots.tolist()
+
+        records = []
+        for i in range(n):
+            listed = []
+            for a in slots[offsets[i]:offsets[i + 1]]:
+                if a not in listed:
+                    listed.append(a)
+            author_names = []
+            for a in listed:
+                name = cache.get(a)
+                if name is None:
+                    name = cache[a] = author_name(a, name_offset)
+                author_names.append(name)
+            tag = PUB_TAGS[types[i]]
+            year = pub_years[i]
+            venue = venues[i]
+            title = " ".join(WORDS[w] for w in words[i]).capitalize()
+            number += 1
+            if tag == "article":
+                key, where = f"journals/j{venue}/P{number}", f"    <journal>J. Synth. {venue}</journal>\n"
+            elif tag == "inproceedings":
+                key, where = f"conf/c{venue}/P{number}", f"    <booktitle>SYNTH {venue}</booktitle>\n"
+            elif tag == "incollection":
+                key, where = f"books/b{venue}/P{number}", f"    <booktitle>Handbook {venue}</booktitle>\n"
+            else:
+                key, where = f"books/b{venue}/P{number}", f"    <publisher>Publisher {venue % 50}</publisher>\n"
+            records.append(
+                f'<{tag} mdate="{year}-01-01" key="{key}">\n'
+                + "".join(f"    <author>{a}</author>\n" for a in author_names)
+                + f"    <title>{title}.</title>\n"
+                + f"    <pages>{pages[i]}-{pages[i] + 9}</pages>\n"
+                + f"    <year>{year}</year>\n"
+                + where
+                + f"</{tag}>\n")
+        out.write("".join(records))
+    out.write("</dblp>\n")
@@ -0,0 +1,150 @@
+import numpy as np
+
+
+# Query result that is sorted and cut into pages on the server. The sort
+# permutation of a column is computed the first time it is asked for and then
+# kept with the table, which lives for as long as the dataset version does not
+# change.
+class SortedTable:
+    def __init__(self, header, rows):
+        self.header = header
+        self.rows = rows
+        self._orders = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def pages(self, size):
+        return max(1, -(-len(self) // size))
+
+    def order(self, column):
+        try:
+            return self._orders[column]
+        except KeyError:
+            pass
+        # a key function rather than a NumPy array of the column, whose fixed
+        # width string dtype would take rows x longest cell of memory
+        rows = self.rows
+        order = np.array(sorted(range(len(rows)), key=lambda i: rows[i][column]), dtype=np.int64)
+        self._orders[column] = order
+        return order
+
+    def page(self, page, size, column=None, descending=False):
+        # rows of one page, page counting from 0; column None keeps the
+        # original row order
+        lo = page * size
+        hi = min(lo + size, len(self))
+        if lo >= hi:
+            return []
+        if column is None:
+            n = len(self)
+            positions = range(n - 1 - lo, n - 1 - hi, -1) if descending else range(lo, hi)
+        else:
+            order = self.order(column)
+            if descending:
+                order = order[::-1]
+            positions = order[lo:hi].tolist()
+        return self.rows_at(positions)
+
+    def rows_at(self, positions):
+        return [self.rows[i] for i in positions]
+
+
+def sequence_order(starts, lengths, values):
+    # Stable order of the sequences values[starts[i]:starts[i] + lengths[i]]
+    # of non-negative integers, compared item by item, a sequence coming
+    # before the longer ones it begins. Each round sorts the sequences that
+    # are still tied on one more item; group holds where each tied group
+    # begins in the final order.
+    n = len(starts)
+    group = np.zeros(n, dtype=np.int64)
+    active = np.arange(n if n > 1 else 0)
+    k = 0
+    while len(active):
+        more = lengths[active] > k
+        key = np.full(len(active), -1, dtype=np.int64)
+        key[more] = values[starts[active[more]] + k]
+        sort = np.lexsort((key, group[active]))
+        active, key = active[sort], key[sort]
+        old = group[active]
+        position = np.arange(len(active))
+        split = np.concatenate(([True], old[1:] != old[:-1]))
+        first = split | np.concatenate(([True], key[1:] != key[:-1]))
+        group[active] = (old + np.maximum.accumulate(np.where(first, position, 0))
+                         - np.maximum.accumulate(np.where(split, position, 0)))
+        runs = np.cumsum(first) - 1
+        # sequences that ended together are equal and stay tied
+        keep = (np.bincount(runs)[runs] > 1) & (key >= 0)
+        active = active[keep]
+        k += 1
+    return np.argsort(group, kind="stable")
+
+
+# The co-author table of a period, kept as the period's co-author graph over
+# the authors in it rather than as rows of strings, which for the whole
+# dataset run to hundreds of megabytes. Row i is author sources[i] and the
+# co-authors of author a are neighbours[bounds[a]:bounds[a + 1]], where a is
+# a position in ids, the author ids of the table, and degree[a] counts them.
+# Cells are built only for the rows asked for. Sorting follows the strings of
+# the cells exactly: a "name degree" label ranks where the label string does,
+# and a list of them as the sequence of its labels, each but the last
+# followed by ", ".
+class CoauthorTable(SortedTable):
+    header = ("Author", "Co-Authors")
+
+    def __init__(self, name_list, ids, sources, bounds, neighbours, degree):
+        self.name_list = name_list
+        self.ids = ids
+        self.sources = sources
+        self.bounds = bounds
+        self.neighbours = neighbours
+        self.degree = degree
+        self._orders = {}
+
+    def __len__(self):
+        return len(self.sources)
+
+    def labels(self, positions):
+        names = self.name_list(self.ids[positions].tolist())
+        return [f"{name} {d}" for name, d in zip(names, self.degree[positions].tolist())]
+
+    def rows_at(self, positions):
+        rows = self.sources[np.asarray(positions, dtype=np.int64)].tolist()
+        if not rows:
+            return []
+        lists = [self.neighbours[self.bounds[a]:self.bounds[a + 1]] for a in rows]
+        needed = np.unique(np.concatenate([np.asarray(rows, dtype=np.int64)] + lists))
+        labels = dict(zip(needed.tolist(), self.labels(needed)))
+        return [[labels[a], ", ".join([labels[c] for c in coauthors.tolist()])]
+                for a, coauthors in zip(rows, lists)]
+
+    def order(self, column):
+        try:
+            return self._orders[column]
+        except KeyError:
+            pass
+        present = np.flatnonzero(self.degree)
+        labels = self.labels(present)
+        if column == 0:
+            rank = np.zeros(len(self.ids), dtype=np.int64)
+            rank[present[sorted(range(len(labels)), key=labels.__getitem__)]] = np.arange(len(labels))
+            order = np.argsort(rank[self.sources], kind="stable")
+        elif column == 1 and not any(", " in label for label in labels):
+            # no label begins with another followed by ", ", so comparing the
+            # items of two lists compares their strings
+            items = labels + [label + ", " for label in labels]
+            rank = np.empty(len(items), dtype=np.int64)
+            rank[sorted(range(len(items)), key=items.__getitem__)] = np.arange(len(items))
+            last = np.zeros(len(self.ids), dtype=np.int64)
+            inner = np.zeros(len(self.ids), dtype=np.int64)
+            last[present], inner[present] = rank[:len(labels)], rank[len(labels):]
+            values = inner[self.neighbours]
+            ends = self.bounds[1:][self.degree > 0] - 1
+            values[ends] = last[self.neighbours[ends]]
+            starts = self.bounds[self.sources]
+            order = sequence_order(starts, self.bounds[self.sources + 1] - starts, values)
+        else:
+            rows = self.rows_at(range(len(self)))
+            order = np.array(sorted(range(len(rows)), key=lambda i: rows[i][column]), dtype=np.int64)
+        self._orders[column] = order
+        return order
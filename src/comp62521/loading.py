@@ -0,0 +1,124 @@
+import math
+import os
+import threading
+import time
+
+from flask import request, Response
+
+from comp62521 import app
+from comp62521.api import json_response
+
+# Background ingest. main.py (with BACKGROUND set) binds the port at once and
+# loads the data in a thread. Until the load has finished every route except
+# the probes below answers 503 with a Retry-After estimate.
+#
+# /healthz: 200 while the process is alive, 500 once the load has failed.
+# /readyz:  200 once the data is loaded, 503 until then.
+# Both return the load progress as JSON.
+
+PROBES = {"healthz", "readyz", "metrics", "static"}
+RETRY_AFTER = 5
+MAX_RETRY_AFTER = 60
+
+
+class Load:
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class BackgroundLoad:
+    def __init__(self, db, filenames, load):
+        # load() fills db from filenames and returns False on failure
+        self.db = db
+        self.filenames = filenames
+        self.load = load
+        self.state = Load.LOADING
+        self.error = None
+        self.started = None
+        self.seconds = None
+        self.bytes_total = sum(os.path.getsize(f) for f in filenames if os.path.exists(f))
+        self._thread = threading.Thread(target=self._run, name="ingest", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.state != Load.LOADING
+
+    def _run(self):
+        try:
+            ok = self.load()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"Error loading data ({self.error})")
+            ok = False
+        self.seconds = time.perf_counter() - self.started
+        self.state = Load.READY if ok else Load.FAILED
+
+    @property
+    def ready(self):
+        return self.state == Load.READY
+
+    def progress(self):
+        elapsed = self.seconds if self.seconds is not None else time.perf_counter() - self.started
+        bytes_read = sum(s.bytes_read for s in list(self.db.ingest_stats))
+        eta = None
+        if self.state == Load.LOADING and 0 < bytes_read <= self.bytes_total:
+            eta = elapsed * (self.bytes_total - bytes_read) / bytes_read
+        return {
+            "state": self.state,
+            "error": self.error,
+            "records": len(self.db.publications),
+            "authors": len(self.db.authors),
+            "bytes_read": bytes_read,
+            "bytes_total": self.bytes_total,
+            "elapsed": elapsed,
+            "eta": eta,
+        }
+
+    def retry_after(self):
+        eta = self.progress()["eta"]
+        if eta is None:
+            return RETRY_AFTER
+        return min(max(math.ceil(eta), 1), MAX_RETRY_AFTER)
+
+
+def _loader():
+    return app.config.get('LOADER')
+
+
+@app.before_request
+def _wait_for_data():
+    loader = _loader()
+    if loader is None or loader.ready or request.endpoint in PROBES:
+        return None
+    if loader.state == Load.FAILED:
+        return Response("Loading the data failed\n", status=503, mimetype="text/plain")
+    response = Response("Loading data, try again shortly\n", status=503, mimetype="text/plain")
+    response.headers["Retry-After"] = str(loader.retry_after())
+    return response
+
+
+@app.route("/healthz")
+def healthz():
+    loader = _loader()
+    if loader is None:
+        return json_response({"state": Load.READY})
+    return json_response(loader.progress(), 500 if loader.state == Load.FAILED else 200)
+
+
+@app.route("/readyz")
+def readyz():
+    loader = _loader()
+    if loader is None:
+        return json_response({"state": Load.READY})
+    if loader.ready:
+        return json_response(loader.progress())
+    response = json_response(loader.progress(), 503)
+    if loader.state == Load.LOADING:
+        response.headers["Retry-After"] = str(loader.retry_after())
+    return response
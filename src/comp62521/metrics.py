@@ -0,0 +1,212 @@
+import functools
+import inspect
+import threading
+import time
+
+import numpy as np
+from flask import request, Response, abort
+
+from comp62521 import app
+from comp62521.database import database
+
+# Instrumentation exposed at /metrics in the Prometheus text format. It is off
+# until enable() is called (main.py does so when METRICS is set). While off,
+# Database methods are not wrapped at all and the request hooks return at once.
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BUCKET_LABELS = [f'le="{le}"' for le in BUCKETS] + ['le="+Inf"']
+PREFIX = "comp62521_"
+
+enabled = False
+_originals = {}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(self, name, help, labels):
+        self.name = PREFIX + name
+        self.help = help
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, values, seconds):
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                series = self._series[values] = [np.zeros(len(BUCKETS) + 1, dtype=np.int64), 0.0]
+            series[0][np.searchsorted(BUCKETS, seconds)] += 1
+            series[1] += seconds
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = sorted((k, v[0].copy(), v[1]) for k, v in self._series.items())
+        for values, counts, total in series:
+            cumulative = np.cumsum(counts).tolist()
+            for le, count in zip(BUCKET_LABELS, cumulative):
+                yield f"{self.name}_bucket{_labels(self.labels, values, le)} {count}"
+            yield f"{self.name}_sum{_labels(self.labels, values)} {total}"
+            yield f"{self.name}_count{_labels(self.labels, values)} {cumulative[-1]}"
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = PREFIX + name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, values, amount=1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            yield f"{self.name}{_labels(self.labels, values)} {value}"
+
+
+def gauge(name, help, samples, labels=()):
+    # a gauge read at scrape time; samples is a list of (label values, value)
+    name = PREFIX + name
+    yield f"# HELP {name} {help}"
+    yield f"# TYPE {name} gauge"
+    for values, value in samples:
+        yield f"{name}{_labels(labels, values)} {value}"
+
+
+route_seconds = Histogram("http_request_duration_seconds",
+                          "Time to produce the response of a route.", ("endpoint",))
+route_requests = Counter("http_requests_total", "Responses by route and status.", ("endpoint", "status"))
+method_seconds = Histogram("database_method_duration_seconds",
+                           "Time spent in Database methods.", ("method",))
+
+
+def _timed(name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            method_seconds.observe((name,), time.perf_counter() - start)
+    return wrapper
+
+
+def enable():
+    # start collecting; wraps every public Database method
+    global enabled
+    if enabled:
+        return
+    for name, method in inspect.getmembers(database.Database, inspect.isfunction):
+        if not name.startswith("_"):
+            _originals[name] = method
+            setattr(database.Database, name, _timed(name, method))
+    enabled = True
+
+
+def disable():
+    global enabled
+    for name, method in _originals.items():
+        setattr(database.Database, name, method)
+    _originals.clear()
+    enabled = False
+
+
+@app.before_request
+def _start_timer():
+    if enabled:
+        request.environ["comp62521.start"] = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    start = request.environ.get("comp62521.start")
+    if start is not None:
+        endpoint = request.endpoint or "unknown"
+        route_seconds.observe((endpoint,), time.perf_counter() - start)
+        route_requests.inc((endpoint, str(response.status_code)))
+    return response
+
+
+def _nbytes(*arrays):
+    return sum(int(getattr(a, "nbytes", 0)) for a in arrays)
+
+
+def _structure_sizes(db):
+    # bytes held by the major structures, counting only those already built
+    store = db.publications
+    sizes = [("publications", _nbytes(*(getattr(store, c).values for c in store.COLUMNS))),
+             ("authors", db.authors.nbytes)]
+    built = {
+        "coauthor_graph": db._coauthor_graph,
+        "coauthor_index": db._coauthor_index,
+        "count_cube": db._count_cube,
+        "name_index": db._name_index,
+    }
+    for name, structure in built.items():
+        if structure is not None:
+            sizes.append((name, _nbytes(*vars(structure).values())))
+    for name, array in (("appearance", db._appearance), ("publication_counts", db._publication_counts)):
+        if array is not None:
+            sizes.append((name, array.nbytes))
+    return [((name,), size) for name, size in sizes]
+
+
+def collect(db):
+    yield from route_seconds.collect()
+    yield from route_requests.collect()
+    yield from method_seconds.collect()
+    if not isinstance(db, database.Database):
+        return
+
+    yield from gauge("publications", "Publications loaded.", [((), len(db.publications))])
+    yield from gauge("authors", "Distinct authors loaded.", [((), len(db.authors))])
+    yield from gauge("dataset_version", "Number of changes made to the loaded data.", [((), db.version)])
+    yield from gauge("duplicates_removed", "Duplicate publications dropped while loading.",
+                     [((), db.duplicates_removed)])
+    stats = db.ingest_stats
+    yield from gauge("ingest_records", "Publications read from each file.",
+                     [((s.filename, s.parser), s.records) for s in stats], ("file", "parser"))
+    yield from gauge("ingest_seconds", "Time taken to read each file.",
+                     [((s.filename, s.parser), s.seconds) for s in stats], ("file", "parser"))
+    yield from gauge("ingest_records_per_second", "Ingest throughput for each file.",
+                     [((s.filename, s.parser), s.records_per_second) for s in stats], ("file", "parser"))
+
+    cache = db.cache.info()
+    lookups = cache["hits"] + cache["misses"]
+    for name in ("hits", "misses", "evictions", "rejected"):
+        yield f"# HELP {PREFIX}query_cache_{name}_total Query cache {name}."
+        yield f"# TYPE {PREFIX}query_cache_{name}_total counter"
+        yield f"{PREFIX}query_cache_{name}_total {cache[name]}"
+    yield from gauge("query_cache_entries", "Results held in the query cache.", [((), cache["size"])])
+    yield from gauge("query_cache_bytes", "Approximate size of the results held in the query cache.",
+                     [((), cache["bytes"])])
+    yield from gauge("query_cache_hit_ratio", "Share of query cache lookups that were hits.",
+                     [((), cache["hits"] / lookups if lookups else 0.0)])
+    yield from gauge("structure_bytes", "Memory held by the arrays of each structure.",
+                     _structure_sizes(db), ("structure",))
+
+
+@app.route("/metrics")
+def metrics():
+    if not enabled:
+        abort(404)
+    text = "\n".join(collect(app.config.get('DATABASE'))) + "\n"
+    return Response(text, mimetype="text/plain; version=0.0.4")
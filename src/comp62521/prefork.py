@@ -0,0 +1,132 @@
+import gc
+import os
+import signal
+import socket
+import time
+
+from werkzeug.serving import make_server
+
+# Pre-fork serving: the parent loads the data once, builds every derived
+# structure and then forks worker processes that accept connections on one
+# shared listening socket. The workers share the parent's memory
+# copy-on-write. The bulk of the data is in NumPy arrays, whose buffers are
+# never written after loading, and gc.freeze() keeps the collector from
+# touching the headers of the remaining Python objects, so those pages stay
+# shared as well.
+
+POLL_SECONDS = 0.5
+
+
+def freeze(db):
+    if hasattr(db, "finalize"):
+        db.finalize()
+    # frozen objects are never collected: let those of a Database that a
+    # reload has replaced go first
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+
+
+def listen(host, port, backlog=128):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def _worker(app, host, port, sock):
+    # serve until SIGTERM or SIGINT, finishing the request in progress
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    server = make_server(host, port, app, fd=sock.fileno())
+    server.timeout = POLL_SECONDS
+    try:
+        while not stopping:
+            server.handle_request()
+    finally:
+        os._exit(0)
+
+
+def serve(app, host, port, workers, sock=None, reloader=None, interval=None):
+    # Fork that many worker processes serving app, and replace any that die,
+    # until SIGTERM or SIGINT. With a reloader, SIGHUP (or, every interval
+    # seconds, a change to the data files) builds a new Database in this
+    # process and then replaces all workers with ones that serve it.
+    if sock is None:
+        sock = listen(host, port)
+    children = set()
+    retired = set()
+    stopping = False
+    reload_requested = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            _worker(app, host, port, sock)
+        children.add(pid)
+
+    def terminate(pids):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        terminate(children | retired)
+
+    def hangup(signum, frame):
+        nonlocal reload_requested
+        reload_requested = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGHUP, hangup)
+    for _ in range(workers):
+        spawn()
+    print(f"Serving on http://{host}:{port} with {workers} worker processes")
+
+    checked = time.monotonic()
+    while children or retired:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if pid == 0:
+                break
+            retired.discard(pid)
+            if pid in children:
+                children.discard(pid)
+                if not stopping:
+                    print(f"Worker {pid} exited with status {status}, starting another")
+                    spawn()
+        if stopping:
+            if not children and not retired:
+                break
+        elif reloader is not None:
+            if interval and time.monotonic() - checked >= interval:
+                checked = time.monotonic()
+                reload_requested = reload_requested or reloader.changed()
+            if reload_requested:
+                reload_requested = False
+                if reloader.reload():
+                    freeze(app.config['DATABASE'])
+                    old = set(children)
+                    children.clear()
+                    for _ in range(workers):
+                        spawn()
+                    retired.update(old)
+                    terminate(old)
+        time.sleep(POLL_SECONDS)
+    sock.close()
@@ -0,0 +1,116 @@
+import os
+import signal
+import threading
+import time
+
+from flask import abort, current_app, request
+
+from comp62521 import app
+from comp62521.api import json_response
+from comp62521.database import snapshot
+
+# Hot reload of the data files. A new Database is built off to the side and
+# then swapped into app.config['DATABASE'] in one assignment. Every view reads
+# that reference once, so requests already running finish against the old
+# Database, and the new one starts with its own empty query cache and ETag.
+#
+# A reload is started by a change to the data files (polled every RELOAD
+# seconds by main.py), by POST /admin/reload or, under the pre-fork server,
+# by SIGHUP to the parent process. /admin/reload is only served once
+# enable() is called, and POST /admin/reload always needs the RELOAD_TOKEN in
+# an X-Reload-Token header; without a token it is refused.
+
+
+class Reloader:
+    def __init__(self, filenames, build):
+        # build() returns a new, fully loaded Database, or None on failure
+        self.filenames = filenames
+        self.build = build
+        self.pid = os.getpid()
+        self.generation = 0
+        self.state = "idle"
+        self.error = None
+        self.seconds = None
+        self.reloaded = None
+        self._sources = self._fingerprint()
+        self._lock = threading.Lock()
+
+    def _fingerprint(self):
+        try:
+            return snapshot.fingerprint(self.filenames)
+        except OSError:
+            return None
+
+    def changed(self):
+        sources = self._fingerprint()
+        return sources is not None and sources != self._sources
+
+    def reload(self):
+        # build and swap in a new Database; False if the build failed or
+        # another reload is already running
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            sources = self._fingerprint()
+            self.state = "building"
+            start = time.perf_counter()
+            try:
+                db = self.build()
+                self.error = None if db is not None else "loading the data failed"
+            except Exception as e:
+                db = None
+                self.error = f"{type(e).__name__}: {e}"
+            self.seconds = time.perf_counter() - start
+            if db is None:
+                print(f"Reload failed ({self.error})")
+                self.state = "failed"
+                return False
+            app.config['DATABASE'] = db
+            self._sources = sources
+            self.generation += 1
+            self.reloaded = time.time()
+            self.state = "idle"
+            print(f"Reloaded the data in {self.seconds:.2f}s (generation {self.generation})")
+            return True
+        finally:
+            self._lock.release()
+
+    def request(self):
+        # start a reload without waiting for it. In a pre-fork worker the
+        # parent does the reload and then replaces the workers.
+        if os.getpid() != self.pid:
+            os.kill(self.pid, signal.SIGHUP)
+        else:
+            threading.Thread(target=self.reload, name="reload", daemon=True).start()
+
+    def watch(self, interval):
+        # reload whenever the data files change, checking every interval seconds
+        def poll():
+            while True:
+                time.sleep(interval)
+                if self.changed():
+                    self.reload()
+        threading.Thread(target=poll, name="reload-watch", daemon=True).start()
+        return self
+
+    def status(self):
+        return {"generation": self.generation, "state": self.state, "error": self.error,
+                "seconds": self.seconds, "reloaded": self.reloaded, "changed": self.changed()}
+
+
+def enable(flask_app, reloader, token):
+    # serve /admin/reload on flask_app for reloader
+    flask_app.config['RELOADER'] = reloader
+    flask_app.config['RELOAD_TOKEN'] = token
+    flask_app.add_url_rule("/admin/reload", "admin_reload", admin_reload, methods=["GET", "POST"])
+
+
+def admin_reload():
+    reloader = current_app.config['RELOADER']
+    if request.method == "POST":
+        token = current_app.config.get('RELOAD_TOKEN')
+        if not token or request.headers.get("X-Reload-Token") != token:
+            abort(403)
+        reloader.request()
+        return json_response(reloader.status(), 202)
+    return json_response(reloader.status())
@@ -1,38 +1,51 @@
+import numpy as np
+
+# Every statistic accepts a sequence or a 1-D array, or a 2-D array for which
+# it returns one result per column.
+
+# integer data with values below this limit is counted with np.bincount
+_BINCOUNT_LIMIT = 1 << 20
+
 
 def mean(X):
+    X = np.asarray(X)
+    if X.ndim == 2:
+        if len(X) == 0:
+            return [0] * X.shape[1]
+        return (X.sum(axis=0) / float(len(X))).tolist()
     n = len(X)
     if n > 0:
-        return float(sum(X)) / float(len(X))
+        return float(X.sum()) / float(n)
     return 0
 
 
 def median(X):
+    X = np.asarray(X)
     n = len(X)
-    if n == 0:
+    if X.ndim == 2:
+        if n == 0:
+            return [0] * X.shape[1]
+    elif n == 0:
         return 0
-    L = sorted(X)
-    m = int(n / 2)
+    m = n // 2
+    # only the middle one or two values are put in place, not a full sort
     if n % 2:
-        return L[m]
-    return mean(L[m - 1:m + 1])
+        return np.partition(X, m, axis=0)[m].tolist()
+    L = np.partition(X, [m - 1, m], axis=0)
+    return ((L[m - 1] + L[m]) / 2.0).tolist()
 
 
 def mode(X):
-    n = len(X)
-    if n == 0:
+    X = np.asarray(X)
+    if X.ndim == 2:
+        return [mode(X[:, i]) for i in range(X.shape[1])]
+    if len(X) == 0:
         return []
 
-    d = {}
-    for item in X:
-        if item in d:
-            d[item] += 1
-        else:
-            d[item] = 1
-
-    m = (0, 0)
-    for key in d.keys():
-        if d[key] > m[1]:
-            m = ([key], d[key])
-        elif d[key] == m[1]:
-            m = (sorted(m[0] + [key]), d[key])
-    return m[0]
+    if X.dtype.kind in "iu" and X.min() >= 0 and X.max() < _BINCOUNT_LIMIT:
+        counts = np.bincount(X.astype(np.int64))
+        values = np.flatnonzero(counts == counts.max())
+    else:
+        values, counts = np.unique(X, return_counts=True)
+        values = values[counts == counts.max()]
+    return values.tolist()
@@ -1,9 +1,12 @@
 from flask.helpers import url_for
 from comp62521 import app
 from comp62521.database import database
-from flask import render_template, request, flash, redirect
+from flask import render_template, request, flash, redirect, abort, Response, stream_with_context
 import string
 
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+
 
 def format_data(data):
     fmt = "%.2f"
@@ -16,46 +19,55 @@ def format_data(data):
     return result
 
 
+def stream_template(template_name, **context):
+    # render a template as a stream of chunks, so large pages are sent while
+    # they are generated instead of being built in memory first
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(5)
+    return Response(stream_with_context(stream))
+
+
+def page_url(**changes):
+    # URL of the current page with some query arguments replaced
+    values = request.args.to_dict()
+    values.update(changes)
+    values.update(request.view_args)
+    return url_for(request.endpoint, **values)
+
+
+def table_page(table):
+    # the page of table selected by the page, page_size, sort and order
+    # query arguments
+    size = min(max(request.args.get("page_size", PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    pages = table.pages(size)
+    page = min(max(request.args.get("page", 0, type=int), 0), pages - 1)
+    sort = request.args.get("sort", type=int)
+    if sort is not None and not 0 <= sort < len(table.header):
+        sort = None
+    descending = request.args.get("order") == "desc"
+    return {"page": page, "pages": pages, "size": size, "total": len(table),
+            "sort": sort, "descending": descending,
+            "rows": table.page(page, size, sort, descending)}
+
+
 @app.route("/averages")
 def showAverages():
     dataset = app.config['DATASET']
     db = app.config['DATABASE']
     args = {"dataset": dataset, "id": "averages", 'title': "Averaged Data"}
-    tables = []
     headers = ["Average", "Conference Paper", "Journal", "Book", "Book Chapter", "All Publications"]
     averages = [database.Stat.MEAN, database.Stat.MEDIAN, database.Stat.MODE]
-    tables.append({
-        "id": 1,
-        "title": "Average Authors per Publication",
-        "header": headers,
-        "rows": [
-            [database.Stat.STR[i]]
-            + format_data(db.get_average_authors_per_publication(i)[1])
-            for i in averages]})
-    tables.append({
-        "id": 2,
-        "title": "Average Publications per Author",
+    _, data = db.get_averages()
+    tables = [{
+        "id": t + 1,
+        "title": database.AverageTable.STR[t],
         "header": headers,
         "rows": [
             [database.Stat.STR[i]]
-            + format_data(db.get_average_publications_per_author(i)[1])
-            for i in averages]})
-    tables.append({
-        "id": 3,
-        "title": "Average Publications in a Year",
-        "header": headers,
-        "rows": [
-            [database.Stat.STR[i]]
-            + format_data(db.get_average_publications_in_a_year(i)[1])
-            for i in averages]})
-    tables.append({
-        "id": 4,
-        "title": "Average Authors in a Year",
-        "header": headers,
-        "rows": [
-            [database.Stat.STR[i]]
-            + format_data(db.get_average_authors_in_a_year(i)[1])
-            for i in averages]})
+            + format_data(data[t][i])
+            for i in averages]}
+        for t in range(len(data))]
 
     args['tables'] = tables
     return render_template("averages.html", args=args)
@@ -80,19 +92,14 @@ def showCoAuthors():
     if "pub_type" in request.args:
         pub_type = int(request.args.get("pub_type"))
 
-    args["data"] = db.get_coauthor_data(start_year, end_year, pub_type)
+    table = db.get_table("get_coauthor_data", start_year, end_year, pub_type)
+    args["paging"] = table_page(table)
+    args["page_url"] = page_url
+    args["data"] = (table.header, args["paging"]["rows"])
     args["data_len"] = len(args["data"][1])
-    
-    data_list = []
-    for i in args["data"][1]:
-        data_list.append(i) 
-    table = str.maketrans('', '',string.digits)
-    for i in range(len(data_list)):
-        data_list[i] = data_list[i][0]
-        data_list[i] = data_list[i].translate(table)
-        data_list[i] = data_list[i].strip()
-    
-    args["author_names"] = data_list 
+
+    digits = str.maketrans('', '', string.digits)
+    args["author_names"] = [row[0].translate(digits).strip() for row in args["data"][1]]
     
     args["start_year"] = start_year
     args["end_year"] = end_year
@@ -102,7 +109,7 @@ def showCoAuthors():
     args["start_year"] = start_year
     args["end_year"] = end_year
     args["pub_str"] = PUB_TYPES[pub_type]
-    return render_template("coauthors.html", args=args)
+    return stream_template("coauthors.html", args=args)
 
 
 @app.route("/")
@@ -140,13 +147,17 @@ def showPublicationSummaryLink(status):
 
     if status == "publication_author":
         args["title"] = "Author Publication"
-        args["data"] = db.get_publications_by_author()
-    
-    if status == "author_apperance":
+        table = db.get_table("get_publications_by_author")
+    elif status == "author_apperance":
         args["title"] = "First/Last Appearance on paper by Author"
-        args["data"] = db.get_appearance_by_author()
+        table = db.get_table("get_appearance_by_author")
+    else:
+        abort(404)
 
-    return render_template('statistics_details_link.html', args=args)
+    args["paging"] = table_page(table)
+    args["page_url"] = page_url
+    args["data"] = (table.header, args["paging"]["rows"])
+    return stream_template('statistics_details_link.html', args=args)
 
 @app.route("/authorappearance", methods=['GET'])
 def showAuthorAppearance():
@@ -201,12 +212,8 @@ def search_author_pub():
 
     try:
         if name:
-            args["data"] = db.get_author_pub_by_year(name)
-            # args["author_name"] = args['data'][1][0][0]
-            args["author_stats"] = []
-            for i in range(len(args['data'][1])):
-                if start_year <= int(args['data'][1][i][1]) <= end_year:
-                    args["author_stats"] += [args['data'][1][i]]
+            args["data"] = db.get_author_pub_by_year(name, start_year, end_year)
+            args["author_stats"] = args["data"][1]
             return render_template('searchauthorpub.html', args=args)
 
     except:
@@ -274,14 +281,15 @@ def get_separation_between_authors():
 
     headers = ["Author 1", "Author 2", "Degrees of separation"]
     args['data'] = [headers, [" ", " ", 0]]
+    args['path'] = []
 
     name1 = request.args.get('author1')
     name2 = request.args.get('author2')
 
     try:
         if name1 and name2:
-            args["data"] = db.get_separation(name1, name2)
-            print(args["data"])
+            header, data, args["path"] = db.get_separation_with_path(name1, name2)
+            args["data"] = header, data
             return render_template('separation.html', args=args)
     
     except:
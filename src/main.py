@@ -1,9 +1,12 @@
 from numpy.core.arrayprint import dtype_is_implied
-from comp62521 import app
+from comp62521 import app, loading, metrics, prefork, reload
 from comp62521.database import database, mock_database
 import sys
 import os
 
+if "METRICS" in os.environ:
+    metrics.enable()
+
 if len(sys.argv) == 1:
     dataset = "Mock"
     db = mock_database.MockDatabase()
@@ -14,14 +17,39 @@ else:
         path, ds = os.path.split(i)
         print(f"Database: path={path} name={ds}")
         dataset = dataset + ds + ' '
-    db = database.Database()
-    if not db.read(data_files):
+
+    def new_database():
+        return database.Database(duplicates=database.Duplicates.KEEP_LAST,
+                                 staff_file=os.environ.get("STAFF", database.STAFF_FILE))
+
+    def load(db):
+        snapshot = os.environ.get("SNAPSHOT")
+        if snapshot and db.load_snapshot(snapshot, data_files):
+            print(f"Database: loaded snapshot {snapshot}")
+            return True
+        processes = int(os.environ.get("PROCESSES", 1)) or None
+        if not db.read(data_files, streaming="STREAMING" in os.environ, processes=processes):
+            return False
+        if snapshot:
+            db.save_snapshot(snapshot, data_files)
+            print(f"Database: saved snapshot {snapshot}")
+        return True
+
+    def build():
+        db = new_database()
+        if not load(db):
+            return None
+        db.finalize()
+        return db
+
+    db = new_database()
+    if "BACKGROUND" in os.environ and "WORKERS" not in os.environ:
+        app.config['LOADER'] = loading.BackgroundLoad(db, data_files, lambda: load(db)).start()
+    elif not load(db):
         sys.exit(1)
 
-try:
-    db.remove_duplicate_publications()
-except:
-    print("     WARNING!!   Duplicated publications remove is failed!!!")
+    if "RELOAD" in os.environ:
+        reload.enable(app, reload.Reloader(data_files, build), os.environ.get("RELOAD_TOKEN"))
 
 app.config['DATASET'] = dataset.split()
 app.config['DATABASE'] = db
@@ -33,4 +61,12 @@ if "DEBUG" in os.environ:
 if "TESTING" in os.environ:
     app.config['TESTING'] = True
 
-app.run(host='0.0.0.0', port=9292)
+workers = int(os.environ.get("WORKERS", 0))
+interval = float(os.environ.get("RELOAD", 0))
+if workers:
+    prefork.freeze(db)
+    prefork.serve(app, '0.0.0.0', 9292, workers, reloader=app.config.get('RELOADER'), interval=interval)
+else:
+    if interval and 'RELOADER' in app.config:
+        app.config['RELOADER'].watch(interval)
+    app.run(host='0.0.0.0', port=9292)
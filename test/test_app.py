@@ -1,6 +1,18 @@
 from os import path
 import unittest
 import comp62521
+import flask
+import gc
+from comp62521 import loading, metrics, prefork, reload
+import http.client
+import os
+import signal
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from comp62521.database import database, mock_database
 
 
 class TestApp(unittest.TestCase):
@@ -17,6 +29,195 @@ class TestApp(unittest.TestCase):
         r = self.app.get("/")
         self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
 
+    def test_mock_database(self):
+        comp62521.app.config['DATABASE'] = mock_database.MockDatabase()
+        r = self.app.get("/statisticsdetailslink/publication_author?sort=5&order=desc")
+        self.assertEqual(200, r.status_code)
+        self.assertLess(r.data.index(b"Author2"), r.data.index(b"Author1"))
+        r = self.app.get("/api/summary")
+        self.assertEqual(200, r.status_code)
+        self.assertEqual(r.get_json()["rows"][0][1], 10)
+        self.assertNotIn("ETag", r.headers)
+
+    def test_api_etag(self):
+        directory, _ = path.split(__file__)
+        db = database.Database()
+        self.assertTrue(db.read(path.join(directory, "..", "data", "simple.xml")))
+        comp62521.app.config['DATABASE'] = db
+        r = self.app.get("/api/summary")
+        self.assertEqual(200, r.status_code)
+        self.assertEqual(r.get_json()["rows"][0][0], "Number of publications")
+        etag = r.headers["ETag"]
+        r = self.app.get("/api/summary", headers={"If-None-Match": etag})
+        self.assertEqual(304, r.status_code)
+        db.add_publication(database.Publication.BOOK, "Book", 2000, ["AUTHOR1"], "extra/1")
+        r = self.app.get("/api/summary", headers={"If-None-Match": etag})
+        self.assertEqual(200, r.status_code)
+        self.assertNotEqual(etag, r.headers["ETag"])
+        self.assertEqual(404, self.app.get("/api/authors/nobody").status_code)
+
+        # the collaboration counts change with the staff roster as well
+        work = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work)
+        roster = path.join(work, "staff.txt")
+        with open(roster, "w") as f:
+            f.write("Bijan Parsia\n")
+        db = database.Database(staff_file=roster)
+        self.assertTrue(db.read(path.join(directory, "..", "data", "dblp_curated_sample.xml")))
+        comp62521.app.config['DATABASE'] = db
+        r = self.app.get("/api/collaboration")
+        etag = r.headers["ETag"]
+        self.assertEqual(r.get_json()["rows"], [["Bijan Parsia", 0, 8, 8]])
+        with open(roster, "a") as f:
+            f.write("Cornelia Hedeler\n")
+        r = self.app.get("/api/collaboration", headers={"If-None-Match": etag})
+        self.assertEqual(200, r.status_code)
+        self.assertEqual(r.get_json()["rows"], [["Cornelia Hedeler", 1, 30, 31], ["Bijan Parsia", 1, 7, 8]])
+
+    def test_metrics(self):
+        self.assertEqual(404, self.app.get("/metrics").status_code)
+        directory, _ = path.split(__file__)
+        metrics.enable()
+        try:
+            db = database.Database()
+            self.assertTrue(db.read(path.join(directory, "..", "data", "simple.xml")))
+            comp62521.app.config['DATABASE'] = db
+            self.assertEqual(200, self.app.get("/api/summary").status_code)
+            text = self.app.get("/metrics").get_data(as_text=True)
+        finally:
+            metrics.disable()
+        self.assertIn('comp62521_http_requests_total{endpoint="api_summary",status="200"} 1', text)
+        self.assertIn('comp62521_database_method_duration_seconds_count{method="read"} 1', text)
+        self.assertIn('comp62521_database_method_duration_seconds_bucket{method="read",le="+Inf"} 1', text)
+        self.assertIn("comp62521_publications 1", text)
+        self.assertIn("comp62521_query_cache_misses_total 1", text)
+        self.assertIn("comp62521_query_cache_rejected_total 0", text)
+        self.assertIn('comp62521_structure_bytes{structure="publications"}', text)
+        self.assertNotIn("_timed", database.Database.read.__qualname__)
+
+    def test_background_load(self):
+        directory, _ = path.split(__file__)
+        data = path.join(directory, "..", "data", "dblp_curated_sample.xml")
+        db = database.Database()
+        go = threading.Event()
+
+        def load():
+            go.wait()
+            return db.read(data)
+
+        comp62521.app.config['DATABASE'] = db
+        loader = loading.BackgroundLoad(db, [data], load)
+        comp62521.app.config['LOADER'] = loader.start()
+        try:
+            r = self.app.get("/averages")
+            self.assertEqual(503, r.status_code)
+            self.assertEqual(str(loading.RETRY_AFTER), r.headers["Retry-After"])
+            self.assertEqual(503, self.app.get("/api/summary").status_code)
+            self.assertEqual(503, self.app.get("/readyz").status_code)
+            r = self.app.get("/healthz")
+            self.assertEqual(200, r.status_code)
+            self.assertEqual(r.get_json()["state"], "loading")
+            go.set()
+            self.assertTrue(loader.wait(30))
+            r = self.app.get("/readyz")
+            self.assertEqual(200, r.status_code)
+            progress = r.get_json()
+            self.assertEqual(progress["records"], 932)
+            self.assertEqual(progress["bytes_read"], progress["bytes_total"])
+            self.assertEqual(200, self.app.get("/api/summary").status_code)
+        finally:
+            del comp62521.app.config['LOADER']
+
+    def test_prefork(self):
+        directory, _ = path.split(__file__)
+        db = database.Database()
+        self.assertTrue(db.read(path.join(directory, "..", "data", "dblp_curated_sample.xml")))
+        comp62521.app.config['DATABASE'] = db
+        db.finalize()
+        self.assertIsNotNone(db._count_cube)
+        sock = prefork.listen("127.0.0.1", 0)
+        port = sock.getsockname()[1]
+        pid = os.fork()
+        if pid == 0:
+            prefork.serve(comp62521.app, "127.0.0.1", port, 2, sock)
+            os._exit(0)
+        sock.close()
+        try:
+            for _ in range(4):
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                conn.request("GET", "/api/summary")
+                response = conn.getresponse()
+                self.assertEqual(200, response.status)
+                self.assertIn(b"Number of publications", response.read())
+                conn.close()
+        finally:
+            os.kill(pid, signal.SIGTERM)
+            _, status = os.waitpid(pid, 0)
+        self.assertEqual(0, status)
+
+        # freezing the next Database releases the one it replaces
+        self.addCleanup(gc.unfreeze)
+        prefork.freeze(db)
+        authors = weakref.ref(db.authors)
+        db = database.Database()
+        self.assertTrue(db.read(path.join(directory, "..", "data", "simple.xml")))
+        comp62521.app.config['DATABASE'] = db
+        prefork.freeze(db)
+        self.assertIsNone(authors())
+
+    def test_reload(self):
+        directory, _ = path.split(__file__)
+        work = tempfile.mkdtemp()
+        data = path.join(work, "data.xml")
+        shutil.copy(path.join(directory, "..", "data", "simple.xml"), data)
+
+        def build():
+            db = database.Database()
+            return db if db.read(data) else None
+
+        old = build()
+        comp62521.app.config['DATABASE'] = old
+        reloader = reload.Reloader([data], build)
+        # the route only exists on an app reload is enabled for, and a POST
+        # always needs the token, even from this host
+        self.assertEqual(404, self.app.post("/admin/reload").status_code)
+        admin = flask.Flask("admin")
+        reload.enable(admin, reloader, None)
+        self.assertEqual(403, admin.test_client().post("/admin/reload").status_code)
+        admin = flask.Flask("admin")
+        reload.enable(admin, reloader, "secret")
+        client = admin.test_client()
+        try:
+            etag = self.app.get("/api/summary").headers["ETag"]
+            self.assertFalse(reloader.changed())
+            self.assertEqual(403, client.post("/admin/reload").status_code)
+            self.assertEqual(403, client.post("/admin/reload", headers={"X-Reload-Token": "wrong"}).status_code)
+            self.assertEqual(200, client.get("/admin/reload").status_code)
+
+            shutil.copy(path.join(directory, "..", "data", "dblp_curated_sample.xml"), data)
+            self.assertTrue(reloader.changed())
+            self.assertEqual(202, client.post("/admin/reload", headers={"X-Reload-Token": "secret"}).status_code)
+            for _ in range(100):
+                if reloader.generation == 1:
+                    break
+                time.sleep(0.1)
+            self.assertEqual(reloader.generation, 1)
+            self.assertFalse(reloader.changed())
+            db = comp62521.app.config['DATABASE']
+            self.assertIsNot(db, old)
+            self.assertEqual(len(db.publications), 932)
+            self.assertEqual(len(old.publications), 1)
+            r = self.app.get("/api/summary", headers={"If-None-Match": etag})
+            self.assertEqual(200, r.status_code)
+
+            with open(data, "w") as f:
+                f.write("<dblp><article")
+            self.assertFalse(reloader.reload())
+            self.assertEqual(reloader.state, "failed")
+            self.assertIs(comp62521.app.config['DATABASE'], db)
+        finally:
+            shutil.rmtree(work)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 from comp62521.statistics import average
 
 
@@ -63,5 +65,24 @@ class TestAverage(unittest.TestCase):
         self.assertEqual(average.mode([3, 3, 2, 1]), [3])
 
 
+    def test_mode_of_non_integer_values(self):
+        self.assertEqual(average.mode([2.5, -1.0, 2.5, -1.0, 0.0]), [-1.0, 2.5])
+
+    def test_mode_of_negative_values(self):
+        self.assertEqual(average.mode([-3, -3, 5]), [-3])
+
+    def test_statistics_are_column_wise_for_2d_arrays(self):
+        X = np.array([[1, 4], [2, 4], [2, 1], [7, 3]])
+        self.assertEqual(average.mean(X), [3.0, 3.0])
+        self.assertEqual(average.median(X), [2.0, 3.5])
+        self.assertEqual(average.mode(X), [[2], [4]])
+        self.assertEqual(average.median(X[:3]), [2, 4])
+
+    def test_statistics_of_empty_2d_array(self):
+        X = np.zeros((0, 3), dtype=int)
+        self.assertEqual(average.mean(X), [0, 0, 0])
+        self.assertEqual(average.median(X), [0, 0, 0])
+        self.assertEqual(average.mode(X), [[], [], []])
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,38 @@
 from os import path
+import gzip
+import os
+import shutil
+import tempfile
 import unittest
 
-from comp62521.database import database
+import numpy as np
+
+from comp62521.database import authors, cache, database, ingest, synthetic
+from comp62521.database.table import SortedTable, sequence_order
+
+
+def scan_author_names(names, query):
+    # every name that matches query, ranked as search_author_names ranks them:
+    # the whole name, then a whole last, first or middle name, then a prefix
+    # of the last or first name, then any substring
+    found = []
+    if query:
+        query_l = query.lower()
+        for name in names:
+            parts = name.lower().split()
+            if query == name:
+                found.append((name, 0))
+            elif query_l in parts:
+                j = parts.index(query_l)
+                found.append((name, 1 if j == len(parts) - 1 else 3 if j == 0 else 5))
+            elif parts[-1].startswith(query_l):
+                found.append((name, 2))
+            elif parts[0].startswith(query_l):
+                found.append((name, 4))
+            elif query_l in name.lower():
+                found.append((name, 6))
+    found.sort(key=lambda p: (p[1], p[0].split()[-1], p[0].split()[0]))
+    return [name for name, _ in found]
 
 
 class TestDatabase(unittest.TestCase):
@@ -25,6 +56,61 @@ class TestDatabase(unittest.TestCase):
                                  path.join(self.data_dir, "dblp_curated_sample_half.xml"),
                                  path.join(self.data_dir, "dblp_curated_sample_half.xml")]))
 
+    def test_read_streaming(self):
+        files = [path.join(self.data_dir, "dblp_curated_sample.xml"), path.join(self.data_dir, "missing_title.xml")]
+        db = database.Database()
+        self.assertTrue(db.read(files))
+        streamed = database.Database()
+        self.assertTrue(streamed.read(files, streaming=True))
+        self.assertEqual(streamed.publications.titles, db.publications.titles)
+        self.assertEqual(streamed.publications.keys, db.publications.keys)
+        self.assertEqual(list(streamed.get_all_authors()), list(db.get_all_authors()))
+        self.assertEqual(streamed.get_publications_by_year(), db.get_publications_by_year())
+        self.assertEqual(len(streamed.ingest_stats), 2)
+        self.assertEqual(streamed.ingest_stats[0].records, 932)
+
+        # compressed input is decompressed on the fly
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        compressed = path.join(tmp, "dblp_curated_sample.xml.gz")
+        with open(files[0], "rb") as src, gzip.open(compressed, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        self.assertTrue(streamed.read(compressed, streaming=True))
+        self.assertEqual(len(streamed.publications), 932)
+
+        self.assertFalse(streamed.read([path.join(self.data_dir, "invalid_xml_file.xml")], streaming=True))
+        self.assertFalse(streamed.read([path.join(self.data_dir, "error.xml")], streaming=True))
+
+    def test_read_parallel(self):
+        files = [path.join(self.data_dir, "dblp_curated_sample.xml"),
+                 path.join(self.data_dir, "missing_year.xml"),
+                 path.join(self.data_dir, "sprint2review/dblp_2006_2010_205_papers.xml")]
+        db = database.Database()
+        self.assertTrue(db.read(files))
+
+        def check(parallel):
+            self.assertEqual(parallel.publications.titles, db.publications.titles)
+            self.assertEqual(parallel.publications.author_ids.values.tolist(),
+                             db.publications.author_ids.values.tolist())
+            self.assertEqual(list(parallel.get_all_authors()), list(db.get_all_authors()),
+                             "author ids differ from a sequential read")
+            self.assertEqual((parallel.min_year, parallel.max_year), (db.min_year, db.max_year))
+
+        parallel = database.Database()
+        self.assertTrue(parallel.read(files, processes=2))
+        check(parallel)
+
+        # large files are cut into chunks at record boundaries
+        chunk_bytes = ingest.CHUNK_BYTES
+        ingest.CHUNK_BYTES = 20000
+        self.addCleanup(setattr, ingest, "CHUNK_BYTES", chunk_bytes)
+        self.assertGreater(len(ingest.split_file(files[0], ingest.CHUNK_BYTES)), 1)
+        parallel = database.Database()
+        self.assertTrue(parallel.read(files, processes=2))
+        check(parallel)
+
+        self.assertFalse(parallel.read([path.join(self.data_dir, "invalid_xml_file.xml")], processes=2))
+
     def test_read_invalid_xml(self):
         db = database.Database()
         self.assertFalse(db.read([path.join(self.data_dir, "invalid_xml_file.xml")]))
@@ -44,6 +130,41 @@ class TestDatabase(unittest.TestCase):
         pb = database.Publication(2, 'testpublication', None, ['author1'], '/testpublication')
         self.assertEqual(pb.year, -1)
 
+    def test_snapshot(self):
+        db = database.Database()
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        source = path.join(tmp, "missing_title.xml")
+        shutil.copy(path.join(self.data_dir, "missing_title.xml"), source)
+        files = [path.join(self.data_dir, "dblp_curated_sample.xml"), source]
+        snapshot_dir = path.join(tmp, "snapshot")
+
+        self.assertFalse(db.load_snapshot(snapshot_dir, files), "loaded a snapshot that was never saved")
+        self.assertTrue(db.read(files))
+        db.save_snapshot(snapshot_dir, files)
+
+        loaded = database.Database()
+        self.assertTrue(loaded.load_snapshot(snapshot_dir, files))
+        self.assertEqual(len(loaded.publications), len(db.publications))
+        self.assertEqual(loaded.min_year, db.min_year)
+        self.assertEqual(loaded.max_year, db.max_year)
+        self.assertEqual(loaded.publications.titles, db.publications.titles)
+        self.assertEqual(loaded.get_publication_summary(), db.get_publication_summary())
+        self.assertEqual(loaded.get_author_info_by_search("ceri"), db.get_author_info_by_search("ceri"))
+        self.assertEqual(loaded.get_separation("Stefano Ceri", "Norman W. Paton"),
+                         db.get_separation("Stefano Ceri", "Norman W. Paton"))
+
+        # a loaded database can still grow
+        loaded.add_publication(1, "New", 2020, ["Stefano Ceri", "New Author"], "new")
+        self.assertEqual(len(loaded.publications), len(db.publications) + 1)
+        self.assertEqual(loaded.search_author_names("New Author"), ["New Author"])
+
+        # changing a source file invalidates the snapshot
+        st = os.stat(source)
+        os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        self.assertFalse(database.Database().load_snapshot(snapshot_dir, files), "loaded a stale snapshot")
+        self.assertFalse(database.Database().load_snapshot(snapshot_dir, files[:1]), "loaded a snapshot of other files")
+
     def test_get_average_authors_per_publication(self):
         db = database.Database()
         self.assertTrue(db.read([path.join(self.data_dir, "sprint-2-acceptance-1.xml")]))
@@ -64,6 +185,20 @@ class TestDatabase(unittest.TestCase):
         _, data = db.get_average_publications_per_author(database.Stat.MODE)
         self.assertEqual(data[0], [0, 1, 2, 3])
 
+    def test_get_averages(self):
+        db = database.Database()
+        self.assertTrue(db.read([path.join(self.data_dir, "sprint-2-acceptance-4.xml")]))
+        header, tables = db.get_averages()
+        self.assertEqual(len(tables), len(database.AverageTable.STR))
+        for t in tables:
+            self.assertEqual(len(t), len(database.Stat.STR))
+            self.assertTrue(all(len(row) == len(header) for row in t))
+        self.assertAlmostEqual(tables[database.AverageTable.AUTHORS_IN_A_YEAR][database.Stat.MEAN][0], 2.8, places=1)
+        self.assertEqual(tables[database.AverageTable.AUTHORS_IN_A_YEAR][database.Stat.MODE][0], [0, 2, 4, 5])
+        for av in range(len(database.Stat.STR)):
+            self.assertEqual(tables[database.AverageTable.PUBLICATIONS_PER_AUTHOR][av],
+                             db.get_average_publications_per_author(av)[1])
+
     def test_get_average_publications_in_a_year(self):
         db = database.Database()
         self.assertTrue(db.read([path.join(self.data_dir, "sprint-2-acceptance-3.xml")]))
@@ -159,6 +294,22 @@ class TestDatabase(unittest.TestCase):
                          (('Author', 'Co-Authors'), [['AUTHOR1 1', 'AUTHOR2 1'], ['AUTHOR2 1', 'AUTHOR1 1']]),
                          "incorrect coauthors in result")
 
+    def test_get_coauthor_data_by_year(self):
+        db = database.Database()
+        self.assertTrue(db.read([path.join(self.data_dir, "dblp_curated_sample.xml")]))
+        ceri, fraternali = db.author_idx["Stefano Ceri"], db.author_idx["Piero Fraternali"]
+        self.assertEqual(db.coauthor_index.collaboration_years(ceri, fraternali), (1992, 2011))
+        self.assertIsNone(db.coauthor_index.collaboration_years(ceri, ceri))
+        _, everything = db.get_coauthor_data(None, None, 4)
+        self.assertEqual(len(everything), len(db.get_coauthor_data(db.min_year, db.max_year, 4)[1]))
+        _, before = db.get_coauthor_data(None, 1991, 4)
+        _, after = db.get_coauthor_data(1992, None, 4)
+        self.assertNotIn("Piero Fraternali", " ".join(r[1] for r in before if r[0].startswith("Stefano Ceri ")))
+        self.assertIn("Piero Fraternali", " ".join(r[1] for r in after if r[0].startswith("Stefano Ceri ")))
+        _, journals = db.get_coauthor_data(1992, 2011, database.Publication.JOURNAL)
+        self.assertTrue(0 < len(journals) < len(everything))
+        self.assertEqual(db.get_coauthor_data(2011, 1992, 4)[1], [])
+
     def test_get_average_authors_per_publication_by_year(self):
         db = database.Database()
         self.assertTrue(db.read([path.join(self.data_dir, "simple.xml")]))
@@ -244,6 +395,18 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(data[5], ['AUTHOR7', 0, 0, 1], "incorrect author appearance times in result")
         self.assertEqual(data[6], ['AUTHOR8', 0, 0, 2], "incorrect author appearance times in result")
 
+    def test_get_author_profiles(self):
+        db = database.Database()
+        self.assertTrue(db.read([path.join(self.data_dir, "dblp_curated_sample.xml")]))
+        ids = [db.author_idx["Norman W. Paton"], db.author_idx["Stefano Ceri"]]
+        profiles = db.get_author_profiles(ids)
+        self.assertEqual([p.name for p in profiles], ["Norman W. Paton", "Stefano Ceri"])
+        self.assertEqual(profiles[1].publications, [100, 94, 6, 18, 218])
+        self.assertEqual(profiles[1].coauthors, 230)
+        self.assertEqual(profiles[1].appearance[database.ALL_TYPES][:2], [78, 25])
+        self.assertEqual(profiles[0].publications, [102, 71, 1, 6, 180])
+        self.assertEqual(db.get_author_profiles([]), [])
+
     def test_get_author_info_by_search(self):
         db = database.Database()
         self.assertTrue(db.read([path.join(self.data_dir, "dblp_curated_sample.xml")]))
@@ -305,6 +468,35 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(data[12], ['Alice Esam', 1, 0, 0, 0, 1, 13, 0, 0], 'incorrect author info')
         self.assertEqual(data[13], ['Brian Esam', 1, 0, 0, 0, 1, 13, 0, 1], 'incorrect author info')
 
+    def test_search_author_names(self):
+        db = database.Database()
+        self.assertTrue(db.read([path.join(self.data_dir, "sprint3-4-sort.xml")]))
+        self.assertEqual(db.search_author_names("sam")[:4], ['Alice Sam', 'Brian Sam', 'Alice Sammer', 'Brian Sammer'],
+                         "incorrect ranking of search result")
+        self.assertEqual(db.search_author_names(""), [])
+        self.assertEqual(db.search_author_names("Non-exist"), [])
+
+        # the index must rank exactly like a scan over every author name
+        self.assertTrue(db.read([path.join(self.data_dir, "dblp_curated_sample.xml")]))
+        names = [a.name for a in db.authors]
+        for query in ["Stefano Ceri", "ceri", "ste", "ua", "robert s", "paton", " w", "A"]:
+            self.assertEqual(db.search_author_names(query),
+                             scan_author_names(names, query),
+                             "index search differs from scan for '%s'" % query)
+
+    def test_appearance_matrix(self):
+        db = database.Database()
+        self.assertTrue(db.read([path.join(self.data_dir, "sprint-2-acceptance-4.xml")]))
+        self.assertEqual(db.appearance.shape, (7, database.ALL_TYPES + 1, 3))
+        self.assertEqual(db.appearance[0, database.ALL_TYPES].tolist(), [1, 0, 2])
+        self.assertEqual(db.appearance[:, :database.ALL_TYPES].sum(axis=1).tolist(),
+                         db.appearance[:, database.ALL_TYPES].tolist())
+        db.add_publication(database.Publication.BOOK, "Book", 2000, ["AUTHOR8", "AUTHOR1"], "extra/1")
+        self.assertEqual(db.appearance[0, database.Publication.BOOK].tolist(), [0, 1, 0])
+        _, data = db.get_appearance_by_author()
+        self.assertEqual(data[0], ['AUTHOR1', 1, 1, 2])
+        self.assertEqual(data[6], ['AUTHOR8', 1, 0, 2])
+
     def test_get_appearance_by_author_by_publications(self):
         db = database.Database()
         self.assertTrue(db.read([path.join(self.data_dir, "sprint-3-2-test-1.xml")]))
@@ -445,6 +637,20 @@ class TestDatabase(unittest.TestCase):
         self.assertRaises(ValueError, db.get_single_author_info, "Non-exist")
         self.assertRaises(ValueError, db.get_single_author_info, "")
 
+    def test_get_author_pub_by_year_range(self):
+        db = database.Database()
+        self.assertTrue(db.read([path.join(self.data_dir, "sprint3.5-example1.xml")]))
+        _, data = db.get_author_pub_by_year('author1', 2001, 2002)
+        self.assertEqual(data, [["author1", "2001", 0, 2, 1, 1, 4], ["author1", "2002", 0, 0, 0, 1, 1]])
+        _, data = db.get_author_pub_by_year('author1', None, 2000)
+        self.assertEqual(data, [["author1", "2000", 2, 2, 3, 0, 7]])
+        _, data = db.get_author_pub_by_year('author2', 2002, 2005)
+        self.assertEqual(data, [])
+        cube = db.count_cube
+        lo, hi = cube.cells_of(db.author_idx['author1'])
+        self.assertEqual(cube.years[lo:hi].tolist(), [2000, 2001, 2002])
+        self.assertEqual(cube.counts[lo:hi].sum(), 12)
+
     def test_get_author_pub_by_year(self):
         db = database.Database()
         self.assertTrue(db.read([path.join(self.data_dir, "sprint3.5-example1.xml")]))
@@ -513,6 +719,31 @@ class TestDatabase(unittest.TestCase):
         self.assertRaises(KeyError, db.get_separation, "", "Author C")
         self.assertRaises(KeyError, db.get_separation, "Author Unknown1", "Author Unknown2")
 
+    def test_get_separation_with_path(self):
+        db = database.Database()
+        self.assertTrue(db.read([path.join(self.data_dir, "sprint3.7-example.xml")]))
+
+        header, data, chain = db.get_separation_with_path('Author E', 'Author C')
+        self.assertEqual(data, ['Author E', 'Author C', 2], "incorrect degree of separation")
+        self.assertEqual(chain, ['Author E', 'Author A', 'Author B', 'Author C'], "incorrect separation path")
+
+        header, data, chain = db.get_separation_with_path('Author C', 'Author B')
+        self.assertEqual(chain, ['Author C', 'Author B'], "incorrect separation path")
+
+        header, data, chain = db.get_separation_with_path('Author A', 'Author F')
+        self.assertEqual(data, ['Author A', 'Author F', 'X'], "incorrect degree of separation")
+        self.assertEqual(chain, [], "unconnected authors should have no path")
+
+        self.assertRaises(KeyError, db.get_separation_with_path, "Author A", "Author Unknown")
+
+        # the search buffers are reused, so every search must leave them clean
+        self.assertEqual(len(db.coauthor_graph._pool), 1)
+        for parents in db.coauthor_graph._pool[0]:
+            self.assertTrue((parents == -1).all())
+        path1 = db.coauthor_graph.shortest_path(db.author_idx['Author E'], db.author_idx['Author C'])
+        self.assertEqual(len(path1), 4)
+        self.assertEqual(db.coauthor_graph.shortest_path(db.author_idx['Author E'], db.author_idx['Author C']), path1)
+
     def test_get_external_coauthor(self):
         db = database.Database()
         self.assertTrue(db.read([path.join(self.data_dir, "dblp_curated_sample.xml")]))
@@ -538,6 +769,36 @@ class TestDatabase(unittest.TestCase):
 
         self.assertRaises(KeyError, db.get_external_coauthor, "Author Unknown")
 
+    def test_staff_roster(self):
+        directory = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        try:
+            roster = path.join(directory, "staff.txt")
+            with open(roster, "w") as f:
+                f.write("Bijan Parsia\nCornelia Hedeler\n")
+            db = database.Database(staff_file=roster)
+            self.assertTrue(db.read([path.join(self.data_dir, "dblp_curated_sample.xml")]))
+            os.chdir(directory)
+            header, data = db.get_external_coauthor("Bijan Parsia")
+            self.assertEqual(data[0], 7)
+            self.assertNotIn("Cornelia Hedeler", data[1])
+            self.assertEqual(db.get_staff_collaboration()[1],
+                             [["Cornelia Hedeler", 1, 30, 31], ["Bijan Parsia", 1, 7, 8]])
+
+            with open(roster, "a") as f:
+                f.write("Alan L. Rector\n")
+            self.assertNotIn("Alan L. Rector", db.get_external_coauthor("Bijan Parsia")[1][1])
+
+            header, data = db.get_external_collaboration()
+            self.assertEqual(len(data), len(db.authors))
+            for name, internal, external, total in data[:50]:
+                self.assertEqual(external, db.get_external_coauthor(name)[1][0])
+                self.assertEqual(total, internal + external)
+            self.assertRaises(KeyError, db.get_external_collaboration, ["Author Unknown"])
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(directory)
+
     def test_multifiles_input(self):  # Test for sprint4.2
         db = database.Database()
         self.assertTrue(db.read([path.join(self.data_dir, "sprint-2-acceptance-1.xml"),
@@ -555,12 +816,202 @@ class TestDatabase(unittest.TestCase):
         self.assertFalse(
             db.read([path.join(self.data_dir, "invalid_xml_file.xml"), path.join(self.data_dir, "simple.xml")]))
 
+    def test_read_duplicates(self):
+        files = [path.join(self.data_dir, "file_1.xml"), path.join(self.data_dir, "file_1.xml"),
+                 path.join(self.data_dir, "dblp_curated_sample.xml")]
+        reference = database.Database()
+        self.assertTrue(reference.read(files))
+        reference.remove_duplicate_publications()
+        for duplicates in (database.Duplicates.KEEP_FIRST, database.Duplicates.KEEP_LAST):
+            for processes in (1, 2):
+                db = database.Database(duplicates=duplicates)
+                self.assertTrue(db.read(files, processes=processes))
+                self.assertEqual(len(db.publications), len(reference.publications))
+                self.assertEqual(sorted(db.publications.keys), sorted(reference.publications.keys))
+                self.assertEqual(db.duplicates_removed, reference.duplicates_removed)
+                self.assertEqual(len(set(db.publications.keys)), len(db.publications))
+        db = database.Database(duplicates=database.Duplicates.KEEP_LAST)
+        self.assertTrue(db.read(files))
+        self.assertEqual(db.publications.keys, reference.publications.keys)
+        self.assertEqual(db.get_publications_by_author(), reference.get_publications_by_author())
+
+    def test_get_table(self):
+        db = database.Database()
+        self.assertTrue(db.read([path.join(self.data_dir, "sprint-2-acceptance-4.xml")]))
+        table = db.get_table("get_appearance_by_author")
+        self.assertIs(db.get_table("get_appearance_by_author"), table)
+        self.assertEqual(len(table), 7)
+        self.assertEqual(table.pages(3), 3)
+        self.assertEqual(table.page(0, 3), table.rows[:3])
+        self.assertEqual(table.page(2, 3), table.rows[6:])
+        self.assertEqual(table.page(3, 3), [])
+        self.assertEqual([r[0] for r in table.page(0, 3, 3, descending=True)], ['AUTHOR8', 'AUTHOR1', 'AUTHOR7'])
+        self.assertEqual([r[3] for r in table.page(0, 7, 3)], [0, 0, 0, 0, 1, 2, 2])
+        self.assertEqual(table.page(0, 2, None, descending=True), table.rows[:-3:-1])
+        self.assertRaises(ValueError, db.get_table, "read", [])
+
+    def test_coauthor_table(self):
+        db = database.Database()
+        self.assertTrue(db.read([path.join(self.data_dir, "dblp_curated_sample.xml")]))
+        whole = db.get_table("get_coauthor_data", None, None, 4)
+        self.assertIs(db.get_coauthor_table(0, 9999, 4), whole)
+        self.assertEqual(len(db.cache), 0)
+        for args in ((None, None, 4), (1990, 2005, 4), (2000, 2005, 1), (1800, 1801, 4)):
+            table = db.get_table("get_coauthor_data", *args)
+            rows = db.get_coauthor_data(*args)[1]
+            expected = SortedTable(table.header, rows)
+            self.assertEqual(len(table), len(rows))
+            for column in (None, 0, 1):
+                for descending in (False, True):
+                    self.assertEqual(table.page(0, len(rows) + 1, column, descending),
+                                     expected.page(0, len(rows) + 1, column, descending), (args, column))
+            self.assertEqual(table.page(1, 7, 1), expected.page(1, 7, 1))
+
+        # sequences order like strings: a prefix comes first, ties keep their order
+        rng = np.random.default_rng(1)
+        sequences = [rng.integers(0, 3, rng.integers(1, 5)).tolist() for _ in range(300)]
+        lengths = np.array([len(seq) for seq in sequences])
+        starts = np.cumsum(lengths) - lengths
+        order = sequence_order(starts, lengths, np.concatenate(sequences))
+        self.assertEqual(order.tolist(), sorted(range(len(sequences)), key=sequences.__getitem__))
+
+    def test_query_cache(self):
+        db = database.Database(cache_size=2)
+        self.assertTrue(db.read([path.join(self.data_dir, "three-authors-and-three-publications.xml")]))
+        summary = db.get_publication_summary()
+        self.assertIs(db.get_publication_summary(), summary)
+        self.assertEqual((db.cache.hits, db.cache.misses), (1, 1))
+        db.add_publication(database.Publication.BOOK, "Book", 2000, ["author1"], "extra/1")
+        self.assertIsNot(db.get_publication_summary(), summary)
+        self.assertEqual(db.get_publication_summary()[1][0][3], 1)
+        db.get_average_authors_per_publication_by_author(database.Stat.MEAN)
+        db.get_average_authors_per_publication_by_author(database.Stat.MEDIAN)
+        self.assertEqual(db.cache.evictions, 1)
+        self.assertEqual(len(db.cache), 2)
+
+        # a lookup under an older version misses without dropping newer results
+        self.assertEqual(db.cache.get(db.version - 1, ("get_publication_summary", (), ())), (False, None))
+        self.assertEqual(len(db.cache), 2)
+
+        # results are also bounded by their approximate size
+        table = [["x" * 100, i] for i in range(1000)]
+        self.assertGreater(cache.result_size(table), 100 * 1000)
+        self.assertLess(cache.result_size(table), 300 * 1000)
+        small = cache.QueryCache(maxsize=10, max_bytes=cache.result_size(table) * 2 - 1)
+        small.get(1, "a")
+        small.put(1, "a", table)
+        small.put(1, "b", table)
+        self.assertEqual(small.get(1, "a"), (False, None))
+        self.assertEqual(small.get(1, "b"), (True, table))
+        small.put(1, "c", table + table + table)
+        self.assertEqual(len(small), 1)
+        self.assertEqual(small.bytes, cache.result_size(table))
+        self.assertEqual(small.info()["rejected"], 1)
+
+    def test_append(self):
+        first = path.join(self.data_dir, "dblp_curated_sample_half.xml")
+        second = path.join(self.data_dir, "dblp_2000_2005_114_papers.xml")
+        full = database.Database()
+        self.assertTrue(full.read([first, second]))
+        db = database.Database()
+        self.assertTrue(db.read(first))
+        db.finalize()
+        info = db.get_single_author_info("Andrew Dinn")
+        early = db.get_coauthor_data(1988, 1999, 4)
+        early_table = db.get_coauthor_table(1988, 1999, 4)
+        db.get_coauthor_data(2000, 2005, 4)
+        db.get_publication_summary()
+
+        report = db.append(second)
+        self.assertTrue(report.valid)
+        self.assertFalse(report.rebuilt)
+        self.assertEqual((report.publications, report.new_authors), (114, 117))
+        self.assertIn("coauthor_index", report.aggregates)
+        self.assertTrue(report.new_edges)
+        # results the new papers cannot change stay cached
+        self.assertIs(db.get_single_author_info("Andrew Dinn"), info)
+        self.assertIs(db.get_coauthor_data(1988, 1999, 4), early)
+        self.assertIs(db.get_coauthor_table(1988, 1999, 4), early_table)
+        self.assertEqual(len(db.cache), 3)
+
+        # the extended structures equal the ones built from both files at once
+        for name in ("offsets", "neighbours", "weights", "paper_counts"):
+            self.assertTrue(np.array_equal(getattr(db.coauthor_graph, name), getattr(full.coauthor_graph, name)))
+        for name in ("offsets", "src", "dst", "order", "edge_order", "first_year", "last_year"):
+            self.assertTrue(np.array_equal(getattr(db.coauthor_index, name), getattr(full.coauthor_index, name)))
+        for name in ("offsets", "authors", "years", "counts", "first"):
+            self.assertTrue(np.array_equal(getattr(db.count_cube, name), getattr(full.count_cube, name)))
+        for name in database.NameIndex.ARRAYS:
+            self.assertTrue(np.array_equal(getattr(db.name_index, name), getattr(full.name_index, name)))
+        self.assertEqual(db.name_index.vocab, full.name_index.vocab)
+        self.assertTrue(np.array_equal(db.appearance, full.appearance))
+        self.assertTrue(np.array_equal(db.publication_counts, full.publication_counts))
+        for query, args in (("get_coauthor_data", (None, None, 4)), ("get_coauthor_data", (2000, 2005, 4)),
+                            ("get_publication_summary", ()), ("get_averages", ()),
+                            ("get_author_totals_by_year", ()), ("search_author_names", ("an",))):
+            self.assertEqual(getattr(db, query)(*args), getattr(full, query)(*args), query)
+        self.assertEqual((db.min_year, db.max_year), (full.min_year, full.max_year))
+
+        # a later copy replacing an earlier one falls back to a rebuild
+        full = database.Database(duplicates=database.Duplicates.KEEP_LAST)
+        self.assertTrue(full.read([first, first]))
+        db = database.Database(duplicates=database.Duplicates.KEEP_LAST)
+        self.assertTrue(db.read(first))
+        report = db.append(first)
+        self.assertTrue(report.rebuilt)
+        self.assertEqual(db.publications.keys, full.publications.keys)
+        self.assertEqual(db.get_coauthor_data(None, None, 4), full.get_coauthor_data(None, None, 4))
+
+    def test_synthetic(self):
+        directory = tempfile.mkdtemp()
+        try:
+            first, second = path.join(directory, "a.xml"), path.join(directory, "b.xml")
+            synthetic.generate(first, 2000, seed=7)
+            synthetic.generate(second, 2000, seed=7)
+            with open(first, "rb") as a, open(second, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+            db = database.Database()
+            self.assertTrue(db.read(first))
+            self.assertEqual(len(db.publications), 2000)
+            self.assertEqual(len(set(db.publications.keys)), 2000)
+            counts = db.publications.author_counts()
+            self.assertTrue(counts.min() >= 1 and 2 <= np.median(counts) <= 3)
+            self.assertTrue(any(not n.isascii() for n in db.get_all_authors()))
+            streamed = database.Database()
+            self.assertTrue(streamed.read(first, streaming=True))
+            self.assertEqual(streamed.get_publications_by_author(), db.get_publications_by_author())
+        finally:
+            shutil.rmtree(directory)
+
+    def test_author_table(self):
+        table = authors.AuthorTable()
+        names = ["Stefano Ceri", "J\u00fcrgen M\u00fcller", "", "Piero Fraternali"]
+        self.assertEqual([table.add(n) for n in names + names], [0, 1, 2, 3] * 2)
+        self.assertEqual(len(table), 4)
+        self.assertEqual(list(table.names), names)
+        self.assertEqual(table.names[-3], names[1])
+        self.assertEqual(table[1].name, names[1])
+        self.assertEqual(table.ids["Piero Fraternali"], 3)
+        self.assertNotIn("Nobody", table.ids)
+        self.assertRaises(KeyError, lambda: table.ids["Nobody"])
+        self.assertRaises(IndexError, lambda: table[4])
+        # enough names to collide in the hash table and make it grow
+        more = [f"Author {i}" for i in range(5000)]
+        self.assertEqual([table.add(n) for n in more], list(range(4, 5004)))
+        self.assertEqual([table.find(n) for n in names + more], list(range(5004)))
+        self.assertEqual(table.find("Author 5000"), -1)
+        self.assertLessEqual(2 * len(table), len(table._slots))
+        self.assertEqual(table.name_list([4003, 1]), ["Author 3999", names[1]])
+        copy = authors.AuthorTable.wrap(table.arena.values, table.offsets.values)
+        self.assertEqual(dict(copy.ids), dict(table.ids))
+
     def test_remove_duplicate_publications(self):
         db = database.Database()
         # two duplicate files input
         self.assertTrue(db.read([path.join(self.data_dir, "file_1.xml"), path.join(self.data_dir, "file_1.xml")]))
-        db.remove_duplicate_publications()
+        self.assertEqual(db.remove_duplicate_publications(), 1)
         self.assertEqual(len(db.publications), 1, "remove duplicate pulications not working")
+        self.assertEqual(db.remove_duplicate_publications(), 0)
 
         # three duplicate files input
         self.assertTrue(db.read([path.join(self.data_dir, "file_1.xml"), path.join(self.data_dir, "file_1.xml"),
@@ -574,7 +1025,7 @@ class TestDatabase(unittest.TestCase):
              path.join(self.data_dir, "dblp_curated_sample.xml")]))
         self.assertEqual(len(db.publications), 2796,
                          "incorrect number of publications before remove duplicate operation")
-        db.remove_duplicate_publications()
+        self.assertEqual(db.remove_duplicate_publications(), 1864)
         self.assertEqual(len(db.publications), 932, "incorrect number of publications after remove duplicate operation")
 
         # complex test 2